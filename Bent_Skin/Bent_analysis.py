@@ -1,201 +1,315 @@
-import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
-from scipy.stats import pearsonr
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import io
 import os
+import sys
+from bent_loader import load_data
+from bent_index import SelectionIndex
+from bent_correlation import correlation_matrix, device_vs_ecg
+from bent_bootstrap import bootstrap_from_sums, participant_sums
+from bent_partitioned import analyse_partitions, partition_paths
+from bent_plotting import plot_counts, plot_device_vs_ecg
+from bent_quality import QualityMask
+from bent_streaming import HIST_BINS
+from bent_shared import share_arrays, attach_arrays
 
-# Change working directory to the script's directory
-script_dir = os.path.dirname(os.path.abspath(__file__))
-os.chdir(script_dir)
-print(f"Changed working directory to: {os.getcwd()}")
+# Stage timing/memory tracing shared with the Harvard scripts (repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation
+from instrumentation import stage
+from regression_plot import OLSFit, plot_regression
+from schemas import memory_report
 
-data = pd.read_csv('deidentified_data.csv')
+# Figures 1-3: 'density' draws each panel as one binned raster image (fast, small PDF);
+# 'scatter' plots every sample as a point like the original figures
+RENDER_MODE = os.environ.get('BENT_RENDER_MODE', 'density')
 
-# Create a PDF file to save all figures
-with PdfPages('bent_analysis_figures.pdf') as pdf:
-    
-    # Figure 1: Overall scatter plots with swapped axes
-    plt.rcParams["figure.figsize"] = (20,3)
-    fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
-    correlations_overall = {}
-    
-    for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev])
-        x = np.array(data.loc[i][dev])  # Device on x-axis
-        y = np.array(data.loc[i]['ECG'])  # ECG on y-axis
-        
-        # Calculate Pearson correlation
-        r, p_value = pearsonr(x, y)
-        correlations_overall[dev] = {'r': r, 'p': p_value, 'n': len(x)}
-        
-        # Format p-value for readability
-        p_text = "p < .001" if p_value < 0.001 else f"p = {p_value:.3f}"
-        
-        ax = axs.flatten()[n]
-        ax.scatter(x,y,s=0.0001)
-        ax.set_title(f'{dev} (N = {len(x)})\nr = {r:.3f}, {p_text}')
-        ax.set_xlabel('Device [bpm]')
-        if n==0:
-            ax.set_ylabel('ECG [bpm]')
-        ax.set_xlim((40,180))
-        ax.set_ylim((40,180))
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
-    
-    # Print overall correlations
-    print("\nOverall Correlations:")
-    for dev, stats in correlations_overall.items():
-        p_text = "p < .001" if stats['p'] < 0.001 else f"p = {stats['p']:.3f}"
-        print(f"{dev}: r = {stats['r']:.4f}, {p_text}, N = {stats['n']}")
+# Scatter figures: (stratum, heading printed after the figure, label used in panel titles)
+SCATTER_FIGURES = {1: ('overall', 'Overall Correlations', 'N = '),
+                   2: ('lighter', 'Lighter Skin Tone Correlations', 'Lighter N='),
+                   3: ('darker', 'Darker Skin Tone Correlations', 'Darker N=')}
 
-    # Figure 2: Lighter skin tone scatter plots with swapped axes
-    plt.rcParams["figure.figsize"] = (20,3)
-    fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
-    correlations_lighter = {}
-    
-    for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev]) & (data['Skin Tone']<4)
-        x = np.array(data.loc[i][dev])  # Device on x-axis
-        y = np.array(data.loc[i]['ECG'])  # ECG on y-axis
-        
-        # Calculate Pearson correlation
-        r, p_value = pearsonr(x, y)
-        correlations_lighter[dev] = {'r': r, 'p': p_value, 'n': len(x)}
-        
-        # Format p-value for readability
-        p_text = "p < .001" if p_value < 0.001 else f"p = {p_value:.3f}"
-        
-        ax = axs.flatten()[n]
-        ax.scatter(x,y,s=0.0001)
-        ax.set_title(f'{dev} (Lighter N={len(x)})\nr = {r:.3f}, {p_text}')
-        ax.set_xlabel('Device [bpm]')
-        if n==0:
-            ax.set_ylabel('ECG [bpm]')
-        ax.set_xlim((40,180))
-        ax.set_ylim((40,180))
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
-    
-    # Print lighter skin tone correlations
-    print("\nLighter Skin Tone Correlations:")
-    for dev, stats in correlations_lighter.items():
-        p_text = "p < .001" if stats['p'] < 0.001 else f"p = {stats['p']:.3f}"
-        print(f"{dev}: r = {stats['r']:.4f}, {p_text}, N = {stats['n']}")
+# Resolution of the raster pages rendered by the --headless --workers pool
+PAGE_DPI = 200
 
-    # Figure 3: Darker skin tone scatter plots with swapped axes
-    plt.rcParams["figure.figsize"] = (20,3)
-    fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
-    correlations_darker = {}
-    
-    for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev]) & (data['Skin Tone']>3)
-        x = np.array(data.loc[i][dev])  # Device on x-axis
-        y = np.array(data.loc[i]['ECG'])  # ECG on y-axis
-        
-        # Calculate Pearson correlation
-        r, p_value = pearsonr(x, y)
-        correlations_darker[dev] = {'r': r, 'p': p_value, 'n': len(x)}
-        
-        # Format p-value for readability
-        p_text = "p < .001" if p_value < 0.001 else f"p = {p_value:.3f}"
-        
-        ax = axs.flatten()[n]
-        ax.scatter(x,y,s=0.0001)
-        ax.set_title(f'{dev} (Darker N={len(x)})\nr = {r:.3f}, {p_text}')
-        ax.set_xlabel('Device [bpm]')
-        if n==0:
-            ax.set_ylabel('ECG [bpm]')
-        ax.set_xlim((40,180))
-        ax.set_ylim((40,180))
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
-    
-    # Print darker skin tone correlations
-    print("\nDarker Skin Tone Correlations:")
-    for dev, stats in correlations_darker.items():
+
+def print_correlations(heading, correlations):
+    print(f"\n{heading}:")
+    for dev, stats in correlations.items():
         p_text = "p < .001" if stats['p'] < 0.001 else f"p = {stats['p']:.3f}"
         print(f"{dev}: r = {stats['r']:.4f}, {p_text}, N = {stats['n']}")
 
-    # Figure 4: Histograms with fixed y-axis limit
-    plt.rcParams["figure.figsize"] = (20,3)
-    fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
-    for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev])
-        x = np.array(data.loc[i]['ECG'])
-        ax = axs.flatten()[n]
-        ax.hist(x,bins=np.arange(40,180,10))
-        ax.set_title(f'{dev} (N = {len(x)})')
-        ax.set_xlabel('ECG [bpm]')
-        if n==0:
-            ax.set_ylabel('N')
-        ax.set_ylim((0,35000))
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
 
-    # Figure 5: Histograms with auto y-axis scaling
-    plt.rcParams["figure.figsize"] = (20,3)
-    fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
-    for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev])
-        x = np.array(data.loc[i]['ECG'])
-        ax = axs.flatten()[n]
-        ax.hist(x,bins=np.arange(40,180,10))
-        ax.set_title(f'{dev} (N = {len(x)})')
-        ax.set_xlabel('ECG [bpm]')
-        if n==0:
-            ax.set_ylabel('N')
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
+def print_rejections(rates, columns):
+    print("\nRejected readings by skin tone (%):")
+    print(rates.pivot(index='device', columns='Skin Tone', values='rejected_%')
+          .reindex(columns).round(2).to_string())
+
 
-    # Figure 6: Percentage histograms
+def render_figure(fig_no, arrays, devices, correlations, render_mode=RENDER_MODE, regression=False):
+    """Build Figure 1-6 from per-device arrays.
+
+    arrays holds ('x', dev, stratum) device readings and ('y', dev, stratum)
+    matching ECG readings; correlations is {stratum: {dev: {'r', 'p', 'n'}}}.
+    For partitioned input it instead holds the reduced counts from
+    PartitionAnalysis.figure_arrays(): ('density', dev, stratum) grids,
+    ('fit', dev, stratum) regression moments and ('hist', dev, bins) ECG
+    histograms, which draw the same panels.
+    regression=True adds the OLS line of ECG on the device reading and its
+    closed-form 95% confidence band to the scatter panels.
+    """
     plt.rcParams["figure.figsize"] = (20,3)
     fig,axs = plt.subplots(1,6)
-    devs = data.columns[1:7]
+
     for n in range(6):
-        dev = devs[n]
-        i = (data['ECG']==data['ECG']) & (data[dev]==data[dev])
-        x = np.array(data.loc[i]['ECG'])
+        dev = devices[n]
         ax = axs.flatten()[n]
-        ax.hist(x,bins=np.arange(40,180,5),weights=100*np.ones(len(x))/len(x))
-        ax.set_title(f'{dev} (N = {len(x)})')
-        ax.set_xlabel('ECG [bpm]')
-        if n==0:
-            ax.set_ylabel('%')
+
+        if fig_no in SCATTER_FIGURES:
+            # Figures 1-3: device vs ECG scatter plots with swapped axes
+            stratum, _, label = SCATTER_FIGURES[fig_no]
+            stats = correlations[stratum][dev]
+            p_text = "p < .001" if stats['p'] < 0.001 else f"p = {stats['p']:.3f}"
+
+            if ('density', dev, stratum) in arrays:
+                counts = arrays[('density', dev, stratum)]
+                bins = int(np.sqrt(len(counts)))
+                plot_counts(ax, counts.reshape(bins, bins))
+                if regression:
+                    moments = arrays[('fit', dev, stratum)]
+                    plot_regression(ax, None, None, scatter=False, fit=OLSFit.from_moments(*moments[:6], moments[6:]))
+                n_points = stats['n']
+            else:
+                x = arrays[('x', dev, stratum)]
+                y = arrays[('y', dev, stratum)]
+                plot_device_vs_ecg(ax, x, y, mode=render_mode)
+                if regression:
+                    plot_regression(ax, x, y, scatter=False)
+                n_points = len(x)
+            ax.set_title(f"{dev} ({label}{n_points})\nr = {stats['r']:.3f}, {p_text}")
+            ax.set_xlabel('Device [bpm]')
+            if n==0:
+                ax.set_ylabel('ECG [bpm]')
+            ax.set_xlim((40,180))
+            ax.set_ylim((40,180))
+        else:
+            # Figure 4: histograms with fixed y-axis limit, 5: auto y-axis, 6: percentages
+            if ('hist', dev, '10 bpm') in arrays:
+                # Binned counts from partitioned input, drawn as the same bars
+                n_points = correlations['overall'][dev]['n']
+                name = '5 bpm' if fig_no == 6 else '10 bpm'
+                counts = arrays[('hist', dev, name)]
+                weights = 100*counts/n_points if fig_no == 6 else counts
+                ax.hist(HIST_BINS[name][:-1],bins=HIST_BINS[name],weights=weights)
+            else:
+                x = arrays[('y', dev, 'overall')]
+                n_points = len(x)
+                if fig_no == 6:
+                    ax.hist(x,bins=np.arange(40,180,5),weights=100*np.ones(len(x))/len(x))
+                else:
+                    ax.hist(x,bins=np.arange(40,180,10))
+            ax.set_title(f'{dev} (N = {n_points})')
+            ax.set_xlabel('ECG [bpm]')
+            if n==0:
+                ax.set_ylabel('%' if fig_no == 6 else 'N')
+            if fig_no == 4:
+                ax.set_ylim((0,35000))
     plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.show()
-
-print("All figures saved to 'bent_analysis_figures.pdf'")
-print(f"Number of unique IDs: {len(set(data['ID']))}")
-
-# Summary table of correlations
-print("\n" + "="*80)
-print("CORRELATION SUMMARY TABLE")
-print("="*80)
-print(f"{'Device':<15} {'Overall r':<12} {'Lighter r':<12} {'Darker r':<12} {'Difference':<12}")
-print("-"*80)
-
-for dev in data.columns[1:7]:
-    overall_r = correlations_overall.get(dev, {}).get('r', 0)
-    lighter_r = correlations_lighter.get(dev, {}).get('r', 0)
-    darker_r = correlations_darker.get(dev, {}).get('r', 0)
-    diff = lighter_r - darker_r
-    print(f"{dev:<15} {overall_r:<12.4f} {lighter_r:<12.4f} {darker_r:<12.4f} {diff:<12.4f}")
-
-print("="*80)
\ No newline at end of file
+    return fig
+
+
+def _render_worker(fig_no, shm_name, layout, devices, correlations, render_mode, regression):
+    # Runs in a pool process: attach to the shared arrays, draw and rasterise
+    # the page here, and send back only the PNG bytes, so the parent never
+    # re-renders a figure (or receives every scatter point) and just writes
+    # the pages in order
+    plt.switch_backend('Agg')
+    shm, arrays = attach_arrays(shm_name, layout)
+    try:
+        fig = render_figure(fig_no, arrays, devices, correlations, render_mode, regression)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=PAGE_DPI, bbox_inches='tight')
+        payload = buf.getvalue()
+        plt.close(fig)
+    finally:
+        del arrays
+        shm.close()
+    return payload
+
+
+def write_page(pdf, png):
+    # Place a finished PNG page 1:1 on a PDF page of the same size
+    image = plt.imread(io.BytesIO(png), format='png')
+    height, width = image.shape[:2]
+    fig = plt.figure(figsize=(width / PAGE_DPI, height / PAGE_DPI), dpi=PAGE_DPI)
+    fig.figimage(image)
+    pdf.savefig(fig, dpi=PAGE_DPI)
+    plt.close(fig)
+
+
+def main(csv_path='deidentified_data.csv', pdf_path='bent_analysis_figures.pdf',
+         headless=False, workers=None, render_mode=RENDER_MODE, n_boot=10000, seed=0, regression=False,
+         quality_filter=False):
+    strata = [stratum for stratum, _, _ in SCATTER_FIGURES.values()]
+    # A directory or glob of per-participant/site exports is reduced partition by partition
+    paths = partition_paths(csv_path)
+    if paths is None:
+        # Parsed once into a checksum-verified column cache (.cache/), memory-mapped on later runs
+        with stage('csv load') as st:
+            data = load_data(csv_path)
+            st.rows = len(data)
+        print(memory_report(data, 'deidentified_data'))
+        rows = len(data)
+
+        if quality_filter:
+            # Out-of-range, flatline and jump artifacts become NaN before any statistic
+            with stage('quality mask', rows=rows):
+                quality = QualityMask.build(data, list(data.columns[1:7]))
+                print_rejections(quality.rejection_rates(data), list(quality.flags))
+                data = quality.apply(data)
+
+        # Validity/stratum bitmaps built once and shared by every figure and table below
+        with stage('mask build', rows=rows):
+            index = SelectionIndex(data)
+            devices = index.devices
+
+        # Pairwise-complete r/n/p for all seven HR columns, every stratum in one call
+        with stage('correlation matrix', rows=rows):
+            matrices = correlation_matrix(data, ['ECG'] + devices, {s: index.strata[s] for s in strata})
+            correlations = {stratum: device_vs_ecg(matrices, stratum, devices) for stratum in strata}
+            inter_device = matrices['overall']['r']
+        with stage('selection arrays'):
+            arrays = {}
+            for stratum in correlations:
+                for dev in devices:
+                    arrays[('x', dev, stratum)], arrays[('y', dev, stratum)] = index.pair(dev, stratum)
+        n_ids = len(set(data['ID']))
+    else:
+        if render_mode != 'density':
+            raise ValueError("Partitioned input keeps binned counts, not every sample; use render_mode='density'")
+        # Each partition is loaded, masked and summarised in its own pool process;
+        # the mergeable partial results are reduced here
+        with stage('partition map/reduce') as st:
+            result = analyse_partitions(paths, workers=workers, quality_filter=quality_filter)
+            st.rows = result.rows
+        print(f"Reduced {len(paths)} partitions ({result.rows} rows)")
+        rows = result.rows
+        if quality_filter:
+            print_rejections(result.rejection_rates(), result.devices)
+        devices = result.devices
+        correlations = {stratum: result.correlations(stratum) for stratum in strata}
+        inter_device = result.correlation_matrix()
+        arrays = result.figure_arrays()
+        n_ids = len(result.ids)
+
+    # Create a PDF file to save all figures
+    with stage('pdf write'), PdfPages(pdf_path) as pdf:
+        if headless and workers and workers > 1:
+            # Batch mode with a pool: every figure is drawn and rasterised in its own
+            # pool process from arrays placed in shared memory; pages are written in
+            # the original order. Raster pages, so only worth it with several cores
+            shm, layout = share_arrays(arrays)
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    jobs = [pool.submit(_render_worker, fig_no, shm.name, layout, devices, correlations, render_mode, regression)
+                            for fig_no in range(1, 7)]
+                    for fig_no, job in enumerate(jobs, start=1):
+                        with stage(f'figure {fig_no}'):
+                            write_page(pdf, job.result())
+                        if fig_no in SCATTER_FIGURES:
+                            stratum, heading, _ = SCATTER_FIGURES[fig_no]
+                            print_correlations(heading, correlations[stratum])
+            finally:
+                shm.close()
+                shm.unlink()
+        else:
+            for fig_no in range(1, 7):
+                with stage(f'figure {fig_no}'):
+                    fig = render_figure(fig_no, arrays, devices, correlations, render_mode, regression)
+                    pdf.savefig(fig, bbox_inches='tight')
+                if headless:
+                    plt.close(fig)
+                else:
+                    plt.show()
+                if fig_no in SCATTER_FIGURES:
+                    stratum, heading, _ = SCATTER_FIGURES[fig_no]
+                    print_correlations(heading, correlations[stratum])
+
+    print(f"All figures saved to '{pdf_path}'")
+    print(f"Number of unique IDs: {n_ids}")
+
+    # Summary table of correlations
+    print("\n" + "="*80)
+    print("CORRELATION SUMMARY TABLE")
+    print("="*80)
+    print(f"{'Device':<15} {'Overall r':<12} {'Lighter r':<12} {'Darker r':<12} {'Difference':<12}")
+    print("-"*80)
+
+    for dev in devices:
+        overall_r = correlations['overall'].get(dev, {}).get('r', 0)
+        lighter_r = correlations['lighter'].get(dev, {}).get('r', 0)
+        darker_r = correlations['darker'].get(dev, {}).get('r', 0)
+        diff = lighter_r - darker_r
+        print(f"{dev:<15} {overall_r:<12.4f} {lighter_r:<12.4f} {darker_r:<12.4f} {diff:<12.4f}")
+
+    print("="*80)
+
+    # Inter-device agreement from the same correlation matrices
+    print("\nINTER-DEVICE CORRELATION MATRIX (overall, pairwise-complete r)")
+    print(inter_device.round(4).to_string())
+
+    # Participant-clustered bootstrap CIs (IDs resampled, not rows)
+    if n_boot:
+        with stage('bootstrap CIs', rows=rows):
+            tone, sums = participant_sums(data, devices)[1:] if paths is None else result.participant_table()
+            ci = bootstrap_from_sums(tone, sums, devices, n_boot=n_boot, seed=seed, workers=workers)
+        print("\n" + "="*80)
+        print(f"95% CLUSTER-BOOTSTRAP CIs ({n_boot} ID resamples, seed {seed})")
+        print("="*80)
+        print(f"{'Device':<15} {'Overall r':<22} {'Lighter r':<22} {'Darker r':<22} {'Difference':<22}")
+        print("-"*80)
+        for _, row in ci.iterrows():
+            cells = [f"[{row[f'{k}_low']:.4f}, {row[f'{k}_high']:.4f}]" for k in ['overall', 'lighter', 'darker', 'difference']]
+            print(f"{row['Device']:<15} " + " ".join(f"{c:<22}" for c in cells))
+        print("="*80)
+    return correlations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bent et al. device-vs-ECG figures and correlation summary')
+    parser.add_argument('data', nargs='?', default=None,
+                        help='CSV, or a directory / glob of per-participant partition CSVs (default: deidentified_data.csv)')
+    parser.add_argument('--headless', action='store_true',
+                        help='batch mode: non-interactive backend, no plt.show(), vector pages drawn in this process')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'pool size for partitions and the bootstrap (default: all cores); with --headless and '
+                             f'more than 1, figures are also drawn in the pool as {PAGE_DPI} dpi raster pages')
+    parser.add_argument('--render-mode', choices=['density', 'scatter'], default=RENDER_MODE)
+    parser.add_argument('--bootstrap', type=int, default=10000, help='cluster-bootstrap replicates for the CI table (0 to skip)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--regression', action='store_true', help='add the OLS line and 95%% confidence band to Figures 1-3')
+    parser.add_argument('--quality', action='store_true', help='drop out-of-range, flatline and jump artifacts first')
+    parser.add_argument('--trace', action='store_true', help='record stage timings/memory to traces/ (or set ANALYSIS_TRACE=1)')
+    args = parser.parse_args()
+
+    if args.trace:
+        instrumentation.enable()
+
+    if args.headless:
+        matplotlib.use('Agg')
+
+    # Paths given on the command line are relative to where the script was run from
+    csv_path = os.path.abspath(args.data) if args.data else 'deidentified_data.csv'
+
+    # Change working directory to the script's directory
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+    print(f"Changed working directory to: {os.getcwd()}")
+
+    main(csv_path=csv_path, headless=args.headless, workers=args.workers, render_mode=args.render_mode,
+         n_boot=args.bootstrap, seed=args.seed, regression=args.regression,
+         quality_filter=args.quality)
@@ -0,0 +1,123 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from bent_index import DEVICES
+from bent_plotting import HR_RANGE, plot_density
+
+# Groupings reported by default; None means the device as a whole
+GROUPINGS = (None, 'ID', 'Activity', 'Skin Tone')
+# Difference axis for the Bland-Altman panels
+DIFF_RANGE = (-60, 60)
+
+
+def paired_long(data, devices=DEVICES, keys=('ID', 'Activity', 'Skin Tone')):
+    """Device-vs-ECG differences for all devices stacked into one long frame.
+
+    One row per (row, device) where both readings exist, with the device as
+    a categorical column plus the grouping keys, the Bland-Altman mean and
+    difference, and the absolute and absolute-percentage errors.
+    """
+    devices = list(devices)
+    ecg = np.asarray(data['ECG'], dtype=float)
+    values = np.column_stack([np.asarray(data[d], dtype=float) for d in devices])
+    valid = ~np.isnan(values) & ~np.isnan(ecg)[:, None]
+    row, col = np.nonzero(valid)
+
+    x = values[row, col]
+    y = ecg[row]
+    diff = x - y
+    long = pd.DataFrame({'device': pd.Categorical.from_codes(col, categories=devices)})
+    for key in keys:
+        long[key] = data[key].to_numpy()[row]
+    long['mean'] = (x + y) / 2
+    long['diff'] = diff
+    long['abs_error'] = np.abs(diff)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        long['ape'] = np.where(y > 0, 100 * np.abs(diff) / y, np.nan)
+    return long
+
+
+def agreement_metrics(data, devices=DEVICES, groupings=GROUPINGS):
+    """Bias, 95% limits of agreement, MAE and MAPE against ECG.
+
+    Every device x group combination of a grouping comes out of one groupby
+    over the stacked differences (no loop over groups). Returns a tidy table
+    with columns device, grouping, group, n, bias, sd, loa_low, loa_high,
+    mae and mape.
+    """
+    keys = [g for g in groupings if g is not None]
+    long = paired_long(data, devices, keys)
+
+    tables = []
+    for grouping in groupings:
+        by = ['device'] if grouping is None else ['device', grouping]
+        stats = long.groupby(by, observed=True, sort=True).agg(
+            n=('diff', 'size'), bias=('diff', 'mean'), sd=('diff', 'std'),
+            mae=('abs_error', 'mean'), mape=('ape', 'mean')).reset_index()
+        stats['grouping'] = 'overall' if grouping is None else grouping
+        stats['group'] = 'all' if grouping is None else stats.pop(grouping).astype(str)
+        tables.append(stats)
+
+    table = pd.concat(tables, ignore_index=True)
+    table['loa_low'] = table['bias'] - 1.96 * table['sd']
+    table['loa_high'] = table['bias'] + 1.96 * table['sd']
+    table['device'] = table['device'].astype(str)
+    return table[['device', 'grouping', 'group', 'n', 'bias', 'sd', 'loa_low', 'loa_high', 'mae', 'mape']]
+
+
+def bland_altman_figure(data, devices=DEVICES, metrics=None, bins=280):
+    """Six Bland-Altman panels (device - ECG vs their mean) drawn as density images."""
+    import matplotlib.pyplot as plt
+
+    devices = list(devices)
+    long = paired_long(data, devices, keys=())
+    if metrics is None:
+        metrics = agreement_metrics(data, devices, groupings=(None,))
+    overall = metrics[metrics['grouping'] == 'overall'].set_index('device')
+
+    fig, axs = plt.subplots(1, len(devices), figsize=(20, 3))
+    codes = long['device'].cat.codes.to_numpy()
+    for n, dev in enumerate(devices):
+        ax = axs.flatten()[n]
+        rows = codes == n
+        plot_density(ax, long['mean'].to_numpy()[rows], long['diff'].to_numpy()[rows],
+                     limits=HR_RANGE, y_limits=DIFF_RANGE, bins=bins)
+        m = overall.loc[dev]
+        ax.axhline(m['bias'], color='red', lw=1)
+        ax.axhline(m['loa_low'], color='red', lw=1, ls='--')
+        ax.axhline(m['loa_high'], color='red', lw=1, ls='--')
+        ax.set_title(f"{dev} (N = {int(m['n'])})\nbias = {m['bias']:.2f}, LoA [{m['loa_low']:.1f}, {m['loa_high']:.1f}]")
+        ax.set_xlabel('Mean of device and ECG [bpm]')
+        if n == 0:
+            ax.set_ylabel('Device - ECG [bpm]')
+        ax.set_xlim(HR_RANGE)
+        ax.set_ylim(DIFF_RANGE)
+    plt.tight_layout()
+    return fig
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='Bland-Altman agreement metrics of each device against ECG')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--out', default='bent_agreement_metrics.csv')
+    parser.add_argument('--plots', default=None, help='also write Bland-Altman panels to this PDF')
+    args = parser.parse_args()
+
+    data = load_data(args.csv)
+    devices = list(data.columns[1:7])
+    metrics = agreement_metrics(data, devices)
+    metrics.to_csv(args.out, index=False)
+    print(metrics[metrics['grouping'].isin(['overall', 'Skin Tone'])].round(3).to_string(index=False))
+    print(f"\nAll {len(metrics)} device x group rows saved to '{args.out}'")
+
+    if args.plots:
+        import matplotlib
+        matplotlib.use('Agg')
+        fig = bland_altman_figure(data, devices, metrics)
+        fig.savefig(args.plots, bbox_inches='tight')
+        print(f"Bland-Altman panels saved to '{args.plots}'")
@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Order of the per-participant sums along the last axis
+SUMS = ('n', 'x', 'y', 'xx', 'yy', 'xy')
+
+
+def participant_sums(data, devices, centre=None):
+    """Per-ID sufficient statistics for each device against ECG.
+
+    Returns (ids, tone, sums), participants sorted by ID, where sums has
+    shape (participants, devices, 6) in SUMS order over rows where both the
+    device and ECG have a reading.
+    Values are centred on the overall device/ECG means before summing so the
+    pooled sums stay numerically well conditioned; centre, a (devices, 2)
+    array of (device, ECG) values, fixes the centring point instead.
+    """
+    # Participants in sorted-ID order, so the bootstrap draws land on the same
+    # participants however the rows were ordered or split into files
+    codes, ids = pd.factorize(np.asarray(data['ID']), sort=True)
+    n_ids = len(ids)
+    # One Fitzpatrick value per participant (the first one recorded)
+    tone = pd.Series(np.asarray(data['Skin Tone'], dtype=float)).groupby(codes).first().to_numpy()
+
+    ecg = np.asarray(data['ECG'], dtype=float)
+    sums = np.zeros((n_ids, len(devices), len(SUMS)))
+    for k, dev in enumerate(devices):
+        x_all = np.asarray(data[dev], dtype=float)
+        rows = ~np.isnan(ecg) & ~np.isnan(x_all)
+        g = codes[rows]
+        cx, cy = (x_all[rows].mean(), ecg[rows].mean()) if centre is None else centre[k]
+        x = x_all[rows] - cx
+        y = ecg[rows] - cy
+        for j, w in enumerate([None, x, y, x * x, y * y, x * y]):
+            sums[:, k, j] = np.bincount(g, weights=w, minlength=n_ids)
+    return ids, tone, sums
+
+
+def recentre(sums, shift):
+    """Sums taken about (cx, cy) re-expressed about (cx + dx, cy + dy).
+
+    shift is (devices, 2) of (dx, dy), so partial sums computed about
+    different centres can be brought to a common one and added.
+    """
+    dx, dy = shift[:, 0], shift[:, 1]
+    n, sx, sy, sxx, syy, sxy = (sums[..., j] for j in range(len(SUMS)))
+    return np.stack([n, sx - n * dx, sy - n * dy, sxx - 2 * dx * sx + n * dx * dx,
+                     syy - 2 * dy * sy + n * dy * dy, sxy - dx * sy - dy * sx + n * dx * dy], axis=-1)
+
+
+def r_from_sums(s):
+    # Pearson r from pooled sums; s[..., j] follows SUMS
+    n, sx, sy, sxx, syy, sxy = (s[..., j] for j in range(len(SUMS)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        r = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+    return np.clip(r, -1.0, 1.0)
+
+
+def _bootstrap_shard(seed, group_sums, n_reps):
+    # Resample participants with replacement inside each skin-tone group.
+    # A replicate is a vector of draw counts per participant, so its pooled
+    # sums are one (replicates x participants) @ (participants x stats) product.
+    rng = np.random.default_rng(seed)
+    totals = {}
+    for name, s in group_sums.items():
+        n_ids = s.shape[0]
+        counts = rng.multinomial(n_ids, np.full(n_ids, 1.0 / n_ids), size=n_reps)
+        totals[name] = (counts @ s.reshape(n_ids, -1)).reshape(n_reps, *s.shape[1:])
+    overall = sum(totals.values())
+    return {'overall': r_from_sums(overall),
+            'lighter': r_from_sums(totals['lighter']),
+            'darker': r_from_sums(totals['darker'])}
+
+
+def bootstrap_correlations(data, devices, n_boot=10000, seed=0, workers=None, shard_size=1000, level=0.95):
+    """Participant-clustered bootstrap CIs for device-vs-ECG r and lighter - darker.
+
+    IDs are resampled with replacement within the lighter (tone 1-3) and
+    darker (tone 4-6) groups, so the group sizes stay fixed. Replicates are
+    split into shards of shard_size, each with its own child of
+    SeedSequence(seed); the result does not depend on the number of workers.
+    Returns one row per device with r and CI bounds for overall, lighter,
+    darker and the difference.
+    """
+    _, tone, sums = participant_sums(data, list(devices))
+    return bootstrap_from_sums(tone, sums, devices, n_boot, seed, workers, shard_size, level)
+
+
+def bootstrap_from_sums(tone, sums, devices, n_boot=10000, seed=0, workers=None, shard_size=1000, level=0.95):
+    # bootstrap_correlations from per-participant sums already in hand
+    # (e.g. reduced from partitioned input)
+    devices = list(devices)
+    groups = {'lighter': tone < 4, 'darker': tone > 3}
+    other = ~(groups['lighter'] | groups['darker'])
+    if other.any():
+        groups['other'] = other
+    group_sums = {name: sums[mask] for name, mask in groups.items()}
+
+    n_shards = -(-n_boot // shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    reps = [min(shard_size, n_boot - k * shard_size) for k in range(n_shards)]
+    if workers == 1 or n_shards == 1:
+        shards = [_bootstrap_shard(s, group_sums, n) for s, n in zip(seeds, reps)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_bootstrap_shard, seeds, [group_sums] * n_shards, reps))
+    boot = {k: np.concatenate([s[k] for s in shards]) for k in shards[0]}
+    boot['difference'] = boot['lighter'] - boot['darker']
+
+    estimate = {'overall': r_from_sums(sums.sum(axis=0)),
+                'lighter': r_from_sums(group_sums['lighter'].sum(axis=0)),
+                'darker': r_from_sums(group_sums['darker'].sum(axis=0))}
+    estimate['difference'] = estimate['lighter'] - estimate['darker']
+
+    tail = (1 - level) / 2 * 100
+    table = pd.DataFrame({'Device': devices})
+    for name in ['overall', 'lighter', 'darker', 'difference']:
+        low, high = np.nanpercentile(boot[name], [tail, 100 - tail], axis=0)
+        table[f'{name}_r'] = estimate[name]
+        table[f'{name}_low'] = low
+        table[f'{name}_high'] = high
+    return table
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from bent_index import HR_COLUMNS
+from bent_streaming import pearson_p
+
+
+def _pairwise_moments(values, valid):
+    # values: rows x k with NaNs already zeroed; valid: rows x k as float 0/1.
+    # For every column pair (i, j) these sums run only over rows where both
+    # i and j are present.
+    n = valid.T @ valid
+    sum_x = values.T @ valid            # [i, j] = sum of column i where j is also present
+    sum_xx = (values * values).T @ valid
+    sum_xy = values.T @ values
+    return n, sum_x, sum_xx, sum_xy
+
+
+def correlation_matrix(data, columns=HR_COLUMNS, strata=None):
+    """Pairwise-complete Pearson r, n and p for every pair of columns.
+
+    data is a DataFrame holding the HR columns. strata optionally maps a name
+    to a boolean row mask; the result then has one entry per stratum, each
+    computed with the same handful of matrix products. Returns
+    {stratum: {'r': DataFrame, 'n': DataFrame, 'p': DataFrame}} (the single
+    stratum is called 'overall' when strata is None).
+    """
+    columns = list(columns)
+    values = np.column_stack([np.asarray(data[c], dtype=float) for c in columns])
+    valid = ~np.isnan(values)
+    # Centre each column on its overall mean first; it does not change r but
+    # keeps the raw sums small enough to avoid cancellation
+    values = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+
+    if strata is None:
+        strata = {'overall': np.ones(len(values), dtype=bool)}
+
+    results = {}
+    for name, rows in strata.items():
+        rows = np.asarray(rows, dtype=bool)
+        v = values[rows]
+        m = valid[rows].astype(float)
+        n, sum_x, sum_xx, sum_xy = _pairwise_moments(v, m)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_xy - sum_x * sum_x.T / n
+            var_i = sum_xx - sum_x ** 2 / n
+            var_j = var_i.T
+            r = np.clip(cov / np.sqrt(var_i * var_j), -1.0, 1.0)
+        r[n < 2] = np.nan
+        p = pearson_p(r, n)
+
+        results[name] = {'r': pd.DataFrame(r, index=columns, columns=columns),
+                         'n': pd.DataFrame(n.astype(np.int64), index=columns, columns=columns),
+                         'p': pd.DataFrame(p, index=columns, columns=columns)}
+    return results
+
+
+def device_vs_ecg(results, stratum, devices):
+    # Same layout as correlations_overall/_lighter/_darker in Bent_analysis.py
+    res = results[stratum]
+    return {dev: {'r': res['r'].loc[dev, 'ECG'], 'p': res['p'].loc[dev, 'ECG'], 'n': int(res['n'].loc[dev, 'ECG'])}
+            for dev in devices}
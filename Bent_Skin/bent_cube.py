@@ -0,0 +1,235 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from bent_index import DEVICES
+from bent_streaming import HIST_BINS, pearson_p
+
+# One cell per combination of these, present in the data
+KEYS = ('ID', 'Skin Tone', 'Activity', 'device')
+# Per-cell moments, in the same centred (Chan/Welford) form as PearsonStats:
+# x is the device reading, y the ECG reading, d = x - y
+MOMENTS = ('n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy', 'sum_abs_d')
+
+
+def _combine(cells, group, n_groups):
+    """Pool the moments of cells sharing a group code (pairwise Chan update, vectorized)."""
+    n = np.bincount(group, weights=cells['n'], minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = np.bincount(group, weights=cells['n'] * cells['mean_x'], minlength=n_groups) / n
+        mean_y = np.bincount(group, weights=cells['n'] * cells['mean_y'], minlength=n_groups) / n
+    dx = cells['mean_x'] - mean_x[group]
+    dy = cells['mean_y'] - mean_y[group]
+    out = {'n': n, 'mean_x': mean_x, 'mean_y': mean_y}
+    for name, extra in [('m2_x', cells['n'] * dx * dx), ('m2_y', cells['n'] * dy * dy),
+                        ('c_xy', cells['n'] * dx * dy)]:
+        out[name] = np.bincount(group, weights=cells[name] + extra, minlength=n_groups)
+    out['sum_abs_d'] = np.bincount(group, weights=cells['sum_abs_d'], minlength=n_groups)
+    return out
+
+
+def _bin_index(values, edges):
+    # np.histogram semantics: half-open bins except the last, which is closed;
+    # values outside the edges get -1
+    idx = np.searchsorted(edges, values, side='right') - 1
+    idx[values == edges[-1]] = len(edges) - 2
+    idx[(values < edges[0]) | (values > edges[-1])] = -1
+    return idx
+
+
+class StatsCube:
+    """Sufficient statistics per (ID, Skin Tone, Activity, device) cell.
+
+    Each cell holds the device-vs-ECG moments (n, means, centred sums of
+    squares and cross-products, sum of |device - ECG|) and ECG histogram
+    counts for every HIST_BINS binning. Built in one grouped pass over the
+    long (row, device) pairs; two cubes merge cell by cell, so rows for new
+    participants can be added without re-reading the old ones. Any
+    stratified r, regression, bias or histogram is then pooled from the
+    selected cells in O(cells).
+    """
+
+    def __init__(self, keys, moments, hist, hist_bins=HIST_BINS):
+        self.keys = keys.reset_index(drop=True)
+        self.moments = {name: np.asarray(moments[name], dtype=float) for name in MOMENTS}
+        self.hist_bins = {name: np.asarray(bins, dtype=float) for name, bins in hist_bins.items()}
+        self.hist = {name: np.asarray(hist[name], dtype=np.int64) for name in self.hist_bins}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, data, devices=DEVICES, hist_bins=HIST_BINS):
+        devices = list(devices)
+        ecg = np.asarray(data['ECG'], dtype=float)
+        values = np.column_stack([np.asarray(data[d], dtype=float) for d in devices])
+        row, col = np.nonzero(~np.isnan(values) & ~np.isnan(ecg)[:, None])
+        x, y = values[row, col], ecg[row]
+
+        long = pd.DataFrame({'ID': np.asarray(data['ID'], dtype=object)[row],
+                             'Skin Tone': np.asarray(data['Skin Tone'], dtype=float)[row],
+                             'Activity': np.asarray(data['Activity'], dtype=object)[row],
+                             'device': np.array(devices, dtype=object)[col]})
+        grouped = long.groupby(list(KEYS), sort=True, dropna=False)
+        group = grouped.ngroup().to_numpy()
+        keys = grouped.size().index.to_frame(index=False)[list(KEYS)]
+        n_cells = len(keys)
+
+        n = np.bincount(group, minlength=n_cells).astype(float)
+        mean_x = np.bincount(group, weights=x, minlength=n_cells) / n
+        mean_y = np.bincount(group, weights=y, minlength=n_cells) / n
+        dx, dy = x - mean_x[group], y - mean_y[group]
+        moments = {'n': n, 'mean_x': mean_x, 'mean_y': mean_y,
+                   'm2_x': np.bincount(group, weights=dx * dx, minlength=n_cells),
+                   'm2_y': np.bincount(group, weights=dy * dy, minlength=n_cells),
+                   'c_xy': np.bincount(group, weights=dx * dy, minlength=n_cells),
+                   'sum_abs_d': np.bincount(group, weights=np.abs(x - y), minlength=n_cells)}
+
+        hist = {}
+        for name, bins in hist_bins.items():
+            edges = np.asarray(bins, dtype=float)
+            b = _bin_index(y, edges)
+            n_bins = len(edges) - 1
+            keep = b >= 0
+            hist[name] = np.bincount(group[keep] * n_bins + b[keep],
+                                     minlength=n_cells * n_bins).reshape(n_cells, n_bins)
+        return cls(keys, moments, hist, hist_bins)
+
+    def merge(self, other):
+        """New cube with the cells of both; cells present in both are pooled."""
+        for name in self.hist_bins:
+            if not np.array_equal(self.hist_bins[name], other.hist_bins.get(name)):
+                raise ValueError(f"Histogram bins '{name}' differ between the cubes")
+        keys = pd.concat([self.keys, other.keys], ignore_index=True)
+        grouped = keys.groupby(list(KEYS), sort=True, dropna=False)
+        group = grouped.ngroup().to_numpy()
+        merged_keys = grouped.size().index.to_frame(index=False)[list(KEYS)]
+        cells = {name: np.concatenate([self.moments[name], other.moments[name]]) for name in MOMENTS}
+        moments = _combine(cells, group, len(merged_keys))
+        hist = {}
+        for name in self.hist_bins:
+            stacked = np.vstack([self.hist[name], other.hist[name]])
+            hist[name] = np.zeros((len(merged_keys), stacked.shape[1]), dtype=np.int64)
+            np.add.at(hist[name], group, stacked)
+        return StatsCube(merged_keys, moments, hist, self.hist_bins)
+
+    def mask(self, where=None):
+        """Cells matching every {key: value or list of values} in where (all cells if None)."""
+        selected = np.ones(len(self), dtype=bool)
+        for key, wanted in (where or {}).items():
+            if key not in KEYS:
+                raise KeyError(f"Unknown cube key {key!r}; use one of {KEYS}")
+            wanted = list(wanted) if isinstance(wanted, (list, tuple, set, np.ndarray)) else [wanted]
+            selected &= self.keys[key].isin(wanted).to_numpy()
+        return selected
+
+    def summarise(self, by=('device',), where=None):
+        """Pooled statistics for each combination of the by keys over the selected cells.
+
+        Columns: n, r, p, slope and intercept of ECG on the device reading,
+        bias (device - ECG), SD of the differences, 95% limits of agreement
+        and MAE.
+        """
+        by = list(by)
+        selected = self.mask(where)
+        keys = self.keys.loc[selected, by]
+        grouped = keys.groupby(by, sort=True, dropna=False)
+        group = grouped.ngroup().to_numpy()
+        out = grouped.size().index.to_frame(index=False)
+        cells = {name: values[selected] for name, values in self.moments.items()}
+        m = _combine(cells, group, len(out))
+
+        n = m['n']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.clip(m['c_xy'] / np.sqrt(m['m2_x'] * m['m2_y']), -1.0, 1.0)
+            slope = m['c_xy'] / m['m2_x']
+            sd = np.sqrt((m['m2_x'] + m['m2_y'] - 2 * m['c_xy']) / (n - 1))
+            mae = m['sum_abs_d'] / n
+        bias = m['mean_x'] - m['mean_y']
+        out['n'] = n.astype(int)
+        out['r'] = np.where(n >= 2, r, np.nan)
+        out['p'] = pearson_p(out['r'].to_numpy(), n)
+        out['slope'] = slope
+        out['intercept'] = m['mean_y'] - slope * m['mean_x']
+        out['bias'] = bias
+        out['sd'] = sd
+        out['loa_low'] = bias - 1.96 * sd
+        out['loa_high'] = bias + 1.96 * sd
+        out['mae'] = mae
+        return out
+
+    def histogram(self, name='10 bpm', where=None):
+        """(counts, edges) of the ECG readings in the selected cells."""
+        return self.hist[name][self.mask(where)].sum(axis=0), self.hist_bins[name]
+
+    def save(self, path):
+        arrays = {f'key_{k}': self.keys[k].to_numpy(dtype=float if k == 'Skin Tone' else str) for k in KEYS}
+        arrays.update({f'moment_{name}': values for name, values in self.moments.items()})
+        for k, name in enumerate(self.hist_bins):
+            arrays[f'hist_{k}'] = self.hist[name]
+            arrays[f'bins_{k}'] = self.hist_bins[name]
+        arrays['hist_names'] = np.array(list(self.hist_bins), dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            keys = pd.DataFrame({k: f[f'key_{k}'] if k == 'Skin Tone' else f[f'key_{k}'].astype(object) for k in KEYS})
+            moments = {name: f[f'moment_{name}'] for name in MOMENTS}
+            names = [str(name) for name in f['hist_names']]
+            hist_bins = {name: f[f'bins_{k}'] for k, name in enumerate(names)}
+            hist = {name: f[f'hist_{k}'] for k, name in enumerate(names)}
+        return cls(keys, moments, hist, hist_bins)
+
+
+def _where(args):
+    where = {}
+    if args.id:
+        where['ID'] = args.id
+    if args.tone:
+        where['Skin Tone'] = args.tone
+    if args.activity:
+        where['Activity'] = args.activity
+    if args.device:
+        where['device'] = args.device
+    return where
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='Persisted per-(ID, Skin Tone, Activity, device) statistics cube')
+    parser.add_argument('--cube', default='bent_cube.npz', help='cube file to create, extend or query')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build the cube from a CSV (replaces any existing cube)')
+    build.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    append = commands.add_parser('append', help="merge new participants' rows into the cube")
+    append.add_argument('csv')
+    query = commands.add_parser('query', help='stratified statistics from the cube alone')
+    query.add_argument('--by', nargs='+', default=['device'], choices=KEYS)
+    query.add_argument('--id', nargs='+')
+    query.add_argument('--tone', nargs='+', type=float, help='Fitzpatrick skin tones, e.g. --tone 5 6')
+    query.add_argument('--activity', nargs='+')
+    query.add_argument('--device', nargs='+')
+    query.add_argument('--histogram', choices=list(HIST_BINS), help='also print the ECG histogram of the selection')
+    args = parser.parse_args()
+
+    if args.command in ('build', 'append'):
+        # Appended files are usually small one-off exports, so skip the column cache
+        data = load_data(args.csv, use_cache=args.command == 'build', verify=False)
+        cube = StatsCube.build(data, data.columns[1:7])
+        if args.command == 'append':
+            cube = StatsCube.load(args.cube).merge(cube)
+        cube.save(args.cube)
+        print(f"{len(cube)} cells ({int(cube.moments['n'].sum())} device-ECG pairs) saved to '{args.cube}'")
+    else:
+        cube = StatsCube.load(args.cube)
+        where = _where(args)
+        print(cube.summarise(args.by, where).round(4).to_string(index=False))
+        if args.histogram:
+            counts, edges = cube.histogram(args.histogram, where)
+            print(f"\nECG histogram ({args.histogram}):")
+            for lo, hi, c in zip(edges[:-1], edges[1:], counts):
+                print(f"  {lo:5.0f}-{hi:<5.0f} {c}")
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# The six wearables compared against the ECG reference, in file order
+DEVICES = ['Apple Watch', 'Empatica', 'Garmin', 'Fitbit', 'Miband', 'Biovotion']
+HR_COLUMNS = ['ECG'] + DEVICES
+
+
+class SelectionIndex:
+    """Validity and stratum bitmaps for deidentified_data.csv, built once.
+
+    Each HR column gets a "not NaN" bitmap and each stratum (overall,
+    lighter, darker, Fitzpatrick tone 1-6, every Activity label) gets a
+    membership bitmap. ``rows(dev, stratum)`` ANDs the two together with the
+    ECG bitmap and caches the resulting packed row index, so asking for the
+    same device x stratum from several figures costs one lookup.
+    """
+
+    def __init__(self, data, devices=None):
+        self.devices = list(devices) if devices is not None else list(data.columns[1:7])
+        # Plain float arrays for every HR column; selections gather from these
+        # instead of going through data.loc, which copies the whole frame
+        self.values = {col: np.asarray(data[col], dtype=float) for col in ['ECG'] + self.devices}
+        self.valid = {col: ~np.isnan(v) for col, v in self.values.items()}
+
+        tone = np.asarray(data['Skin Tone'], dtype=float)
+        self.strata = {'overall': np.ones(len(data), dtype=bool),
+                       'lighter': tone < 4,
+                       'darker': tone > 3}
+        for t in range(1, 7):
+            self.strata[f'tone {t}'] = tone == t
+        if 'Activity' in data.columns:
+            # Compare small category codes rather than strings
+            activity = data['Activity']
+            if not isinstance(activity.dtype, pd.CategoricalDtype):
+                activity = activity.astype('category')
+            codes = activity.cat.codes.to_numpy()
+            for code, label in sorted(enumerate(activity.cat.categories), key=lambda c: str(c[1])):
+                self.strata[f'activity {label}'] = codes == code
+
+        self._rows = {}
+
+    def mask(self, dev, stratum='overall'):
+        # Rows where both ECG and the device have a reading, within the stratum
+        return self.valid['ECG'] & self.valid[dev] & self.strata[stratum]
+
+    def rows(self, dev, stratum='overall'):
+        key = (dev, stratum)
+        if key not in self._rows:
+            self._rows[key] = np.flatnonzero(self.mask(dev, stratum))
+        return self._rows[key]
+
+    def pair(self, dev, stratum='overall'):
+        # Device readings (x) and matching ECG readings (y) for the selection
+        idx = self.rows(dev, stratum)
+        return self.values[dev][idx], self.values['ECG'][idx]
+
+    def ecg(self, dev, stratum='overall'):
+        return self.values['ECG'][self.rows(dev, stratum)]
@@ -0,0 +1,168 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.fft import irfft, next_fast_len, rfft
+
+from bent_bootstrap import r_from_sums
+from bent_index import DEVICES
+
+# Cross-correlation terms in SUMS order, as (device-side, ECG-side) series:
+# 0 = valid mask, 1 = value, 2 = value squared
+_TERMS = [(0, 0), (1, 0), (0, 1), (2, 0), (0, 2), (1, 1)]
+
+
+def lag_sums(x, y, max_lag):
+    """Pearson sums of x[t + k] against y[t] for every lag k = -max_lag..max_lag.
+
+    x is (devices, rows) and y is (rows,), NaN where there is no reading.
+    Missing readings are zeroed and their validity masks are cross-correlated
+    alongside the values, so every lag gets the sums over exactly the pairs
+    where both readings exist. All six terms come from one batch of real
+    FFTs (O(rows log rows) for all lags at once), zero-padded far enough that
+    the circular correlation never wraps. Returns (devices, lags, 6) in SUMS
+    order; a positive lag means the device trails ECG by that many rows.
+    """
+    rows = x.shape[-1]
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    x0, y0 = np.where(mx, x, 0.0), np.where(my, y, 0.0)
+    a = np.stack([mx, x0, x0 * x0], axis=-2).astype(float)
+    b = np.stack([my, y0, y0 * y0]).astype(float)
+
+    size = next_fast_len(rows + max_lag, real=True)
+    fa = rfft(a, size, axis=-1)
+    fb = np.conj(rfft(b, size, axis=-1))
+    # c[k] = sum_t a[t + k] * b[t], with negative k at the end of the buffer
+    c = irfft(np.stack([fa[:, i] * fb[j] for i, j in _TERMS], axis=1), size, axis=-1)
+    out = c[..., np.arange(-max_lag, max_lag + 1) % size]
+    out[:, 0] = np.rint(out[:, 0])
+    return np.moveaxis(out, 1, -1)
+
+
+def _participant_lags(x, y, max_lag):
+    # Pool worker: lag sums for one participant's block of rows
+    return lag_sums(x, y, min(max_lag, x.shape[-1] - 1))
+
+
+def _pad(sums, max_lag):
+    # Participants with fewer rows than max_lag get zero sums at the far lags
+    extra = max_lag - (sums.shape[1] - 1) // 2
+    return np.pad(sums, ((0, 0), (extra, extra), (0, 0))) if extra else sums
+
+
+def lag_curves(data, devices=DEVICES, max_lag=30, workers=None):
+    """Per-participant lag sums for each device against ECG.
+
+    Rows are taken in file order within each ID (the rows are time-synced,
+    so a lag is a number of rows). Device and ECG values are centred on
+    their overall means first so the sums of different participants pool
+    by plain addition. Participants are processed in a process pool unless
+    workers == 1. Returns (ids, tone, lags, sums) with sums of shape
+    (participants, devices, lags, 6).
+    """
+    devices = list(devices)
+    codes, ids = pd.factorize(data['ID'])
+    tone = pd.Series(np.asarray(data['Skin Tone'], dtype=float)).groupby(codes).first().to_numpy()
+
+    # Each participant's rows contiguous and in their original order
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(ids) + 1))
+    ecg = np.asarray(data['ECG'], dtype=float)
+    values = np.vstack([np.asarray(data[d], dtype=float) for d in devices])
+    values = (values - np.nanmean(values, axis=1, keepdims=True))[:, order]
+    ecg = (ecg - np.nanmean(ecg))[order]
+
+    blocks = [(values[:, lo:hi], ecg[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    if workers == 1 or len(blocks) == 1:
+        sums = [_participant_lags(x, y, max_lag) for x, y in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            sums = list(pool.map(_participant_lags, *zip(*blocks), [max_lag] * len(blocks),
+                                 chunksize=max(1, len(blocks) // 32)))
+    sums = np.stack([_pad(s, max_lag) for s in sums])
+    return ids, tone, np.arange(-max_lag, max_lag + 1), sums
+
+
+def _best_lag(r, lags):
+    # Lag of the highest r along the last axis (NaN where no lag qualifies)
+    found = ~np.all(np.isnan(r), axis=-1)
+    k = np.argmax(np.where(np.isnan(r), -np.inf, r), axis=-1)
+    peak = np.take_along_axis(r, k[..., None], axis=-1)[..., 0]
+    return np.where(found, lags[k], np.nan), np.where(found, peak, np.nan), k
+
+
+def lag_analysis(data, devices=DEVICES, max_lag=30, min_pairs=30, workers=None):
+    """Best lag, peak r and lag-corrected r of each device against ECG.
+
+    A lag only counts for a participant when it has at least min_pairs
+    device-ECG pairs. Returns (participants, groups):
+
+    participants: one row per (device, ID) with the best lag, the r at that
+    lag (peak_r), the r at lag 0 and the pairs behind each.
+
+    groups: one row per device and skin-tone group (overall, lighter 1-3,
+    darker 4-6, each Fitzpatrick tone) with the median participant lag, the
+    lag that maximises the pooled r, the pooled r at lag 0, the pooled r
+    after shifting every participant by that group lag (r_corrected) and
+    after shifting each participant by their own best lag (r_individual).
+    """
+    devices = list(devices)
+    ids, tone, lags, sums = lag_curves(data, devices, max_lag, workers)
+    zero = max_lag
+    n = sums[..., 0]
+    r = np.where(n >= min_pairs, r_from_sums(sums), np.nan)
+    best, peak, k = _best_lag(r, lags)
+
+    participants = pd.DataFrame({
+        'device': np.repeat(devices, len(ids)),
+        'ID': np.tile(np.asarray(ids), len(devices)),
+        'Skin Tone': np.tile(tone, len(devices)),
+        'best_lag': best.T.ravel(),
+        'peak_r': peak.T.ravel(),
+        'n_peak': np.take_along_axis(n, k[..., None], axis=-1)[..., 0].T.ravel().astype(int),
+        'r_lag0': r[..., zero].T.ravel(),
+        'n_lag0': n[..., zero].T.ravel().astype(int),
+    })
+
+    groups = {'overall': np.ones(len(ids), dtype=bool), 'lighter': tone < 4, 'darker': tone > 3}
+    for t in np.unique(tone[~np.isnan(tone)]):
+        groups[f'tone {t:g}'] = tone == t
+    # Each participant's sums at their own best lag (zero where they have none)
+    own = np.where(~np.isnan(best)[..., None], np.take_along_axis(sums, k[..., None, None], axis=2)[:, :, 0], 0.0)
+
+    rows = []
+    for name, members in groups.items():
+        pooled = sums[members].sum(axis=0)
+        pooled_r = r_from_sums(pooled)
+        group_lag, group_peak, _ = _best_lag(pooled_r, lags)
+        individual = r_from_sums(own[members].sum(axis=0))
+        median = pd.DataFrame(best[members]).median().to_numpy()
+        for j, dev in enumerate(devices):
+            rows.append({'device': dev, 'group': name, 'participants': int(members.sum()),
+                         'with_lag': int((members & ~np.isnan(best[:, j])).sum()),
+                         'median_lag': median[j], 'pooled_lag': group_lag[j],
+                         'r_lag0': pooled_r[j, zero], 'r_corrected': group_peak[j],
+                         'r_individual': individual[j]})
+    return participants, pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='FFT cross-correlation lag of each device against ECG within each participant')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--max-lag', type=int, default=30, help='largest lag searched, in rows either way')
+    parser.add_argument('--min-pairs', type=int, default=30, help='device-ECG pairs needed at a lag')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default='bent_device_lags.csv', help='per-participant lags')
+    args = parser.parse_args()
+
+    data = load_data(args.csv)
+    participants, groups = lag_analysis(data, data.columns[1:7], max_lag=args.max_lag,
+                                        min_pairs=args.min_pairs, workers=args.workers)
+    participants.to_csv(args.out, index=False)
+    print(f"{len(participants)} device x participant lags (|lag| <= {args.max_lag} rows) saved to '{args.out}'")
+    print("\nDevice lag against ECG by skin-tone group (positive = device trails ECG):")
+    print(groups.round(4).to_string(index=False))
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Column dtypes are declared in schemas.py at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schemas import BENT_SCHEMA, read_with_schema
+
+# Folder that holds this module, deidentified_data.csv and SHA256SUMS.txt
+BENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = 'deidentified_data.csv'
+CACHE_DIR = '.cache'
+# Bumped whenever the on-disk layout changes so older caches get rebuilt
+CACHE_FORMAT = 2
+
+
+def sha256_file(path, block_size=1 << 20):
+    # Hash the file in blocks so the CSV never has to fit in memory
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def published_digest(csv_path, sums_path=None):
+    # Look up the digest listed for this file in SHA256SUMS.txt (None if not listed)
+    if sums_path is None:
+        sums_path = os.path.join(os.path.dirname(os.path.abspath(csv_path)), 'SHA256SUMS.txt')
+    if not os.path.exists(sums_path):
+        return None
+    name = os.path.basename(csv_path)
+    with open(sums_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2 and parts[1].lstrip('*') == name:
+                return parts[0].lower()
+    return None
+
+
+def _cache_dir_for(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR, stem)
+
+
+def _read_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _current_digest(csv_path, manifest):
+    # Re-hashing is much cheaper than parsing, but still skip it when the
+    # file's size and modification time match what the cache was built from
+    st = os.stat(csv_path)
+    if manifest is not None and manifest['size'] == st.st_size and manifest['mtime_ns'] == st.st_mtime_ns:
+        return manifest['sha256']
+    return sha256_file(csv_path)
+
+
+def build_cache(csv_path, cache_dir, digest):
+    # Parse the CSV once with the compact schema and write every column as its
+    # own .npy file. Categoricals (ID, Activity) are stored as their integer
+    # codes plus a label list; nullable integers (Skin Tone) as values plus a
+    # missing-value mask when anything is missing.
+    data = read_with_schema(csv_path, BENT_SCHEMA)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    columns = []
+    for k, col in enumerate(data.columns):
+        values = data[col]
+        if values.dtype == object:
+            values = values.astype('category')
+        entry = {'name': col, 'file': f'col_{k}.npy'}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(cache_dir, entry['file']), values.cat.codes.to_numpy())
+            entry['labels'] = [str(label) for label in values.cat.categories]
+        elif isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+            entry['dtype'] = str(values.dtype)
+            np.save(os.path.join(cache_dir, entry['file']),
+                    values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0))
+            if values.isna().any():
+                entry['na_file'] = f'col_{k}_na.npy'
+                np.save(os.path.join(cache_dir, entry['na_file']), values.isna().to_numpy())
+        else:
+            np.save(os.path.join(cache_dir, entry['file']), values.to_numpy())
+        columns.append(entry)
+
+    st = os.stat(csv_path)
+    manifest = {'format': CACHE_FORMAT, 'source': os.path.basename(csv_path), 'sha256': digest,
+                'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                'rows': len(data), 'columns': columns}
+    # Write the manifest last so a half-written cache is never picked up
+    tmp_path = os.path.join(cache_dir, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(cache_dir, 'manifest.json'))
+    return manifest
+
+
+def read_cache(cache_dir, manifest):
+    # Numeric columns are memory-mapped, so only the pages that get used are read.
+    # Copy-on-write ('c'): in-place edits of the frame work as they would on a
+    # read_csv frame, touching private copies of the pages, never the cache files
+    data = {}
+    for entry in manifest['columns']:
+        values = np.asarray(np.load(os.path.join(cache_dir, entry['file']), mmap_mode='c'))
+        if 'labels' in entry:
+            data[entry['name']] = pd.Categorical.from_codes(values, categories=entry['labels'])
+        elif 'dtype' in entry:
+            if 'na_file' in entry:
+                missing = np.load(os.path.join(cache_dir, entry['na_file']))
+            else:
+                missing = np.zeros(len(values), dtype=bool)
+            data[entry['name']] = pd.arrays.IntegerArray(values, missing)
+        else:
+            data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_data(csv_path=None, use_cache=True, verify=True):
+    """Load deidentified_data.csv through a checksum-verified columnar cache.
+
+    The first call checks the CSV against the digest in SHA256SUMS.txt and
+    converts it to one .npy file per column under .cache/. Later calls
+    memory-map those files instead of re-parsing the CSV. The cache is rebuilt
+    whenever the CSV's SHA-256 no longer matches the one it was built from.
+    Columns come back in the compact BENT_SCHEMA dtypes either way, and the
+    frame can be edited in place like a read_csv frame (the cache files are
+    mapped copy-on-write and never change).
+
+    A CSV that does not match its SHA256SUMS.txt digest raises ValueError
+    before anything is cached; pass verify=False to load it anyway.
+    """
+    if csv_path is None:
+        csv_path = os.path.join(BENT_DIR, DATA_FILE)
+    if not use_cache:
+        return read_with_schema(csv_path, BENT_SCHEMA)
+
+    cache_dir = _cache_dir_for(csv_path)
+    manifest = _read_manifest(cache_dir)
+    digest = _current_digest(csv_path, manifest)
+
+    if verify:
+        expected = published_digest(csv_path)
+        if expected is not None and expected != digest:
+            raise ValueError(f"{os.path.basename(csv_path)} does not match the digest in SHA256SUMS.txt "
+                             f"(expected {expected[:12]}..., got {digest[:12]}...); pass verify=False to load it anyway")
+
+    if manifest is None or manifest['sha256'] != digest or manifest.get('format') != CACHE_FORMAT:
+        print(f"Building column cache for {os.path.basename(csv_path)} in {cache_dir}")
+        manifest = build_cache(csv_path, cache_dir, digest)
+    else:
+        _refresh_stat(csv_path, cache_dir, manifest)
+    return read_cache(cache_dir, manifest)
+
+
+def _refresh_stat(csv_path, cache_dir, manifest):
+    # The file was touched but its contents are unchanged: remember the new
+    # size/mtime so the next run can skip hashing again
+    st = os.stat(csv_path)
+    if manifest['size'] == st.st_size and manifest['mtime_ns'] == st.st_mtime_ns:
+        return
+    manifest['size'], manifest['mtime_ns'] = st.st_size, st.st_mtime_ns
+    with open(os.path.join(cache_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
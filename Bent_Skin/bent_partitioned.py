@@ -0,0 +1,202 @@
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from bent_bootstrap import participant_sums, recentre
+from bent_index import SelectionIndex
+from bent_loader import BENT_SCHEMA, read_with_schema
+from bent_plotting import HR_RANGE, density_grid
+from bent_quality import QualityMask
+from bent_streaming import HIST_BINS, STRATA, PearsonStats, StreamingAnalysis, print_summary
+
+# Grid of the density panels in Figures 1-3 (see bent_plotting.plot_device_vs_ecg)
+DENSITY_BINS = 280
+
+
+def partition_paths(source):
+    """Partition files for a directory or glob pattern; None for a single CSV.
+
+    A directory means every *.csv directly inside it. Files come back sorted
+    so runs are reproducible.
+    """
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.csv'))
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        return None
+    if not paths:
+        raise FileNotFoundError(f"No partition files match '{source}'")
+    return sorted(paths)
+
+
+class PartitionAnalysis:
+    """Everything Bent_analysis.py reports, as mergeable partial results.
+
+    One partition (one participant's or one site's file) is summarised into
+    the per-(device, stratum) Pearson statistics and ECG histograms of
+    StreamingAnalysis plus what the figures and tables need beyond that:
+    pairwise-complete statistics for the inter-device matrix, the density
+    grid and x range of every Figure 1-3 panel, per-participant sums for the
+    cluster bootstrap, the set of IDs and, with the quality filter, rejected
+    reading counts. merge() combines two partial results, so the reduced
+    result matches a run over the concatenated file.
+    """
+
+    def __init__(self, devices, strata=STRATA, hist_bins=HIST_BINS, bins=DENSITY_BINS):
+        self.devices = list(devices)
+        self.columns = ['ECG'] + self.devices
+        self.stream = StreamingAnalysis(self.devices, strata, hist_bins)
+        self.pairs = {pair: PearsonStats() for pair in combinations(self.columns, 2)}
+        self.density = {(dev, s): np.zeros((bins, bins), dtype=np.int64) for dev in self.devices for s in strata}
+        self.x_range = {(dev, s): (np.inf, -np.inf) for dev in self.devices for s in strata}
+        # (ids, tone, sums, centre) per partition; brought to one centre by participant_table()
+        self.participants = []
+        self.ids = set()
+        self.rejected = None
+
+    @property
+    def rows(self):
+        return self.stream.rows
+
+    def update(self, data, quality_filter=False):
+        if quality_filter:
+            quality = QualityMask.build(data, self.devices)
+            rates = quality.rejection_rates(data)
+            rates['rejected'] = np.rint(rates['readings'] * rates['rejected_%'] / 100).astype(np.int64)
+            self._add_rejected(rates[['device', 'Skin Tone', 'readings', 'rejected']])
+            data = quality.apply(data)
+
+        self.stream.update(data)
+        index = SelectionIndex(data, devices=self.devices)
+        for dev in self.devices:
+            for s in self.stream.strata:
+                x, y = index.pair(dev, s)
+                self.density[(dev, s)] += density_grid(x, y, bins=DENSITY_BINS, limits=HR_RANGE).astype(np.int64)
+                if len(x):
+                    low, high = self.x_range[(dev, s)]
+                    self.x_range[(dev, s)] = (min(low, x.min()), max(high, x.max()))
+        for a, b in self.pairs:
+            both = index.valid[a] & index.valid[b]
+            self.pairs[(a, b)].update(index.values[a][both], index.values[b][both])
+
+        # Centre on the device/ECG means so far; shifted to the pooled means later
+        centre = self._means()
+        ids, tone, sums = participant_sums(data, self.devices, centre=centre)
+        self.participants.append((np.asarray(ids, dtype=object), tone, sums, centre))
+        self.ids.update(str(i) for i in ids)
+        return self
+
+    def _means(self):
+        # (device, ECG) means over each device's paired rows, shape (devices, 2)
+        overall = [self.stream.pearson[(dev, 'overall')] for dev in self.devices]
+        return np.array([[p.mean_x, p.mean_y] for p in overall])
+
+    def _add_rejected(self, counts):
+        if self.rejected is not None:
+            counts = pd.concat([self.rejected, counts]).groupby(['device', 'Skin Tone'], sort=False).sum().reset_index()
+        self.rejected = counts
+
+    def merge(self, other):
+        if other.devices != self.devices:
+            raise ValueError(f"Partitions have different device columns: {self.devices} vs {other.devices}")
+        self.stream.merge(other.stream)
+        for key, acc in other.pairs.items():
+            self.pairs[key].merge(acc)
+        for key, counts in other.density.items():
+            self.density[key] += counts
+        for key, (low, high) in other.x_range.items():
+            self.x_range[key] = (min(self.x_range[key][0], low), max(self.x_range[key][1], high))
+        self.participants.extend(other.participants)
+        self.ids.update(other.ids)
+        if other.rejected is not None:
+            self._add_rejected(other.rejected)
+        return self
+
+    def correlations(self, stratum):
+        return self.stream.correlations(stratum)
+
+    def correlation_matrix(self):
+        # Pairwise-complete r between all HR columns, as correlation_matrix(...)['overall']['r']
+        r = pd.DataFrame(np.eye(len(self.columns)), index=self.columns, columns=self.columns)
+        for (a, b), acc in self.pairs.items():
+            r.loc[a, b] = r.loc[b, a] = acc.r()
+        return r
+
+    def participant_table(self):
+        """(tone, sums) per participant in bent_bootstrap.participant_sums layout.
+
+        Every partition's sums are shifted to the pooled device/ECG means and
+        participants that appear in several partitions are added together.
+        Participants come out sorted by ID.
+        """
+        pooled = self._means()
+        ids = np.concatenate([p[0] for p in self.participants])
+        tone = np.concatenate([p[1] for p in self.participants])
+        sums = np.concatenate([recentre(s, pooled - centre) for _, _, s, centre in self.participants])
+        # Sorted-ID order, as participant_sums uses for the single-file run
+        codes, unique = pd.factorize(ids, sort=True)
+        total = np.zeros((len(unique), *sums.shape[1:]))
+        np.add.at(total, codes, sums)
+        first = pd.Series(tone).groupby(codes).first().to_numpy()
+        return first, total
+
+    def rejection_rates(self):
+        if self.rejected is None:
+            return None
+        rates = self.rejected.copy()
+        rates['rejected_%'] = 100 * rates['rejected'] / rates['readings']
+        return rates
+
+    def figure_arrays(self):
+        """1-D arrays for Bent_analysis.render_figure (and share_arrays) built from the counts."""
+        arrays = {}
+        for (dev, s), counts in self.density.items():
+            arrays[('density', dev, s)] = counts.ravel()
+            p = self.stream.pearson[(dev, s)]
+            arrays[('fit', dev, s)] = np.array([p.n, p.mean_x, p.mean_y, p.m2_x, p.m2_y, p.c_xy, *self.x_range[(dev, s)]])
+        for (dev, name), hist in self.stream.hist.items():
+            arrays[('hist', dev, name)] = hist.counts
+        return arrays
+
+
+def analyse_partition(path, quality_filter=False):
+    # Pool worker: one partition in, its PartitionAnalysis out. Only this
+    # file is ever in the worker's memory.
+    data = read_with_schema(path, BENT_SCHEMA)
+    return PartitionAnalysis(data.columns[1:7]).update(data, quality_filter)
+
+
+def analyse_partitions(paths, workers=None, quality_filter=False):
+    """Map analyse_partition over the files in a process pool and merge the results in order."""
+    flags = [quality_filter] * len(paths)
+    if workers == 1 or len(paths) == 1:
+        return _reduce(map(analyse_partition, paths, flags))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _reduce(pool.map(analyse_partition, paths, flags))
+
+
+def _reduce(partials):
+    # Merge as results arrive, so only the running total and one partial are held
+    result = next(partials)
+    for partial in partials:
+        result.merge(partial)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bent correlations and histograms over per-participant/site partition files')
+    parser.add_argument('source', help='directory of partition CSVs or a glob such as "exports/site_*.csv"')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--quality', action='store_true', help='drop out-of-range, flatline and jump artifacts first')
+    args = parser.parse_args()
+
+    paths = partition_paths(args.source) or [args.source]
+    result = analyse_partitions(paths, workers=args.workers, quality_filter=args.quality)
+    print(f"Reduced {len(paths)} partitions: {result.rows} rows, {len(result.ids)} IDs")
+    print_summary(result.stream)
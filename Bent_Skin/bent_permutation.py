@@ -0,0 +1,132 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bent_index import DEVICES
+
+
+def participant_errors(data, devices):
+    """Per-ID error aggregates for each device against ECG.
+
+    Returns (tone, counts, error_sums), one row per participant: counts and
+    error_sums have shape (participants, devices) and hold the number of
+    paired readings and the sum of |device - ECG| over them.
+    """
+    codes, ids = pd.factorize(data['ID'])
+    tone = pd.Series(np.asarray(data['Skin Tone'], dtype=float)).groupby(codes).first().to_numpy()
+    ecg = np.asarray(data['ECG'], dtype=float)
+
+    counts = np.zeros((len(ids), len(devices)))
+    error_sums = np.zeros((len(ids), len(devices)))
+    for k, dev in enumerate(devices):
+        x = np.asarray(data[dev], dtype=float)
+        rows = ~np.isnan(ecg) & ~np.isnan(x)
+        counts[:, k] = np.bincount(codes[rows], minlength=len(ids))
+        error_sums[:, k] = np.bincount(codes[rows], weights=np.abs(x[rows] - ecg[rows]), minlength=len(ids))
+    return tone, counts, error_sums
+
+
+def group_statistic(labels, counts, error_sums, n_groups):
+    """Between-group spread of mean absolute error, for a batch of labelings.
+
+    labels is (permutations, participants) of group codes. For every labeling
+    and device this pools each group's rows into a mean absolute error and
+    returns the count-weighted variance of those group means around the
+    overall mean: 0 when every group has the same error, larger as they
+    diverge. Shape (permutations, devices).
+    """
+    onehot = labels[..., None] == np.arange(n_groups)       # perms x ids x groups
+    onehot = onehot.astype(float)
+    n = np.einsum('pig,id->pgd', onehot, counts)              # rows per group
+    e = np.einsum('pig,id->pgd', onehot, error_sums)          # error per group
+    total_n = counts.sum(axis=0)
+    overall = error_sums.sum(axis=0) / total_n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        group_mean = np.where(n > 0, e / n, overall)
+    return (n * (group_mean - overall) ** 2).sum(axis=1) / total_n
+
+
+def _permutation_shard(seed, labels, counts, error_sums, n_groups, observed, n_perm, batch):
+    # Count how many shuffled labelings give a statistic at least as large as
+    # the observed one, processing the permutations in matrix batches
+    rng = np.random.default_rng(seed)
+    exceed = np.zeros(counts.shape[1], dtype=np.int64)
+    done = 0
+    while done < n_perm:
+        size = min(batch, n_perm - done)
+        shuffled = rng.permuted(np.broadcast_to(labels, (size, len(labels))), axis=1)
+        stat = group_statistic(shuffled, counts, error_sums, n_groups)
+        exceed += (stat >= observed - 1e-12).sum(axis=0)
+        done += size
+    return exceed
+
+
+def permutation_test(data, devices=DEVICES, grouping='tone', n_perm=100_000, seed=0,
+                     workers=None, shard_size=10_000, batch=1000):
+    """Participant-level permutation test for skin-tone differences in device error.
+
+    The skin-tone label of each participant (grouping='tone' for Fitzpatrick
+    1-6, 'lighter/darker' for tones 1-3 vs 4-6) is shuffled across
+    participants, never across rows, so each participant's repeated readings
+    stay together. Shards of shard_size permutations run across a process
+    pool, each seeded from SeedSequence(seed). Returns one row per device with
+    the observed statistic, the per-group mean absolute error and the
+    permutation p-value (with the usual +1 correction; NaN when the observed
+    statistic is not finite).
+    """
+    devices = list(devices)
+    tone, counts, error_sums = participant_errors(data, devices)
+    keep = ~np.isnan(tone)
+    tone, counts, error_sums = tone[keep], counts[keep], error_sums[keep]
+
+    if grouping == 'tone':
+        labels_raw = tone.astype(int)
+    elif grouping == 'lighter/darker':
+        labels_raw = np.where(tone < 4, 0, 1)
+    else:
+        raise ValueError(f"Unknown grouping: {grouping!r} (expected 'tone' or 'lighter/darker')")
+    group_values, labels = np.unique(labels_raw, return_inverse=True)
+    n_groups = len(group_values)
+
+    observed = group_statistic(labels[None, :], counts, error_sums, n_groups)[0]
+
+    n_shards = -(-n_perm // shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = [min(shard_size, n_perm - k * shard_size) for k in range(n_shards)]
+    args = [(s, labels, counts, error_sums, n_groups, observed, n, batch) for s, n in zip(seeds, sizes)]
+    if workers == 1 or n_shards == 1:
+        exceed = sum(_permutation_shard(*a) for a in args)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            exceed = sum(pool.map(_permutation_shard, *zip(*args)))
+
+    # A device with no readings has no observed statistic, so no p-value either
+    p = np.where(np.isfinite(observed), (exceed + 1) / (n_perm + 1), np.nan)
+    table = pd.DataFrame({'Device': devices, 'statistic': observed, 'p': p, 'permutations': n_perm})
+    for g, value in enumerate(group_values):
+        name = f'MAE tone {value}' if grouping == 'tone' else ('MAE lighter', 'MAE darker')[value]
+        rows = labels == g
+        table[name] = error_sums[rows].sum(axis=0) / counts[rows].sum(axis=0)
+    return table
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='Participant-level permutation test of skin-tone effects on device error')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--grouping', choices=['tone', 'lighter/darker'], default='tone')
+    parser.add_argument('--permutations', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    data = load_data(args.csv)
+    result = permutation_test(data, data.columns[1:7], grouping=args.grouping, n_perm=args.permutations,
+                              seed=args.seed, workers=args.workers)
+    print(f"Permutation test of mean absolute error (device - ECG) across skin-tone groups ({args.grouping})")
+    print(f"{args.permutations} participant-level label shuffles, seed {args.seed}\n")
+    print(result.round(4).to_string(index=False))
@@ -0,0 +1,46 @@
+import numpy as np
+from matplotlib.colors import LogNorm
+
+# Fixed axis range used by every device-vs-ECG panel
+HR_RANGE = (40, 180)
+
+
+def density_grid(x, y, bins=280, limits=HR_RANGE, y_limits=None):
+    # Bin every (x, y) sample into a bins x bins grid in one vectorized pass.
+    # Returns counts indexed [y, x] so the grid can go straight to imshow.
+    y_limits = limits if y_limits is None else y_limits
+    counts, _, _ = np.histogram2d(y, x, bins=bins, range=[y_limits, limits])
+    return counts
+
+
+def plot_density(ax, x, y, limits=HR_RANGE, y_limits=None, bins=280, cmap='viridis'):
+    y_limits = limits if y_limits is None else y_limits
+    counts = density_grid(x, y, bins=bins, limits=limits, y_limits=y_limits)
+    return plot_counts(ax, counts, limits=limits, y_limits=y_limits, cmap=cmap)
+
+
+def plot_counts(ax, counts, limits=HR_RANGE, y_limits=None, cmap='viridis'):
+    # Draw a density_grid (possibly summed over partitions) as one log-scaled raster image
+    y_limits = limits if y_limits is None else y_limits
+    # Empty cells are masked so they stay white like the scatter background
+    counts = np.ma.masked_equal(counts, 0)
+    vmax = counts.max() if counts.count() else 1
+    return ax.imshow(counts, origin='lower', extent=(*limits, *y_limits), aspect='auto',
+                     interpolation='nearest', cmap=cmap, norm=LogNorm(vmin=1, vmax=max(vmax, 1)),
+                     rasterized=True)
+
+
+def plot_device_vs_ecg(ax, x, y, mode='density', bins=280, limits=HR_RANGE, cmap='viridis'):
+    """Draw one device-vs-ECG panel.
+
+    mode='density' bins the samples into a bins x bins grid and draws it as a
+    single raster image, so file size and render time depend on the grid and
+    not on how many samples there are. mode='scatter' keeps the original
+    per-sample point plot.
+    """
+    if mode == 'scatter':
+        return ax.scatter(x, y, s=0.0001)
+    if mode != 'density':
+        raise ValueError(f"Unknown render mode: {mode!r} (expected 'density' or 'scatter')")
+
+    return plot_density(ax, x, y, limits=limits, bins=bins, cmap=cmap)
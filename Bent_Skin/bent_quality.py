@@ -0,0 +1,152 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from bent_index import DEVICES
+
+# Quality flags, one bit each in a per-column uint8 array
+OUT_OF_RANGE, FLATLINE, JUMP = 1, 2, 4
+FLAGS = {'out_of_range': OUT_OF_RANGE, 'flatline': FLATLINE, 'jump': JUMP}
+
+# Physiologically plausible heart rate (bpm)
+HR_LIMITS = (30, 220)
+# Identical consecutive readings that count as a stuck / forward-filled signal
+FLATLINE_READINGS = 20
+# Largest change (bpm) between consecutive readings at most MAX_GAP rows apart
+MAX_JUMP = 30
+MAX_GAP = 5
+# Per-device overrides of FLATLINE_READINGS / MAX_JUMP, e.g. {'Fitbit': 40},
+# for wearables whose update rate or smoothing needs a different threshold
+DEVICE_FLATLINE = {}
+DEVICE_MAX_JUMP = {}
+
+
+def quality_flags(values, codes, limits=HR_LIMITS, flatline=FLATLINE_READINGS, max_jump=MAX_JUMP, max_gap=MAX_GAP):
+    """Artifact flags for one HR column, as a uint8 bit mask per row.
+
+    codes are participant codes with every participant's rows contiguous and
+    in time order. Missing readings get 0 (they are already excluded by the
+    NaN masks) and are skipped over, so "consecutive" means consecutive
+    readings of the same participant:
+
+    OUT_OF_RANGE  reading outside limits
+    FLATLINE      reading inside a run of at least flatline identical values
+                  (runs found by run-length encoding the value changes)
+    JUMP          in-range reading that differs by more than max_jump from the
+                  previous in-range reading, when that reading is at most
+                  max_gap rows earlier; an in-range spike therefore flags
+                  both the spike and the reading after it
+    """
+    flags = np.zeros(len(values), dtype=np.uint8)
+    idx = np.flatnonzero(~np.isnan(values))
+    v, g = values[idx], codes[idx]
+    new_id = np.r_[True, g[1:] != g[:-1]]
+
+    out = (v < limits[0]) | (v > limits[1])
+
+    # Run-length encoding: a run starts at every change of value or participant
+    starts = new_id | np.r_[True, v[1:] != v[:-1]]
+    run = np.cumsum(starts) - 1
+    flat = np.bincount(run)[run] >= flatline
+
+    # Jumps are measured between in-range readings only, so one impossible
+    # value doesn't also flag the good reading after it
+    ok = np.flatnonzero(~out)
+    step = np.abs(np.diff(v[ok]))
+    close = (np.diff(idx[ok]) <= max_gap) & (g[ok][1:] == g[ok][:-1])
+    jump = np.zeros(len(v), dtype=bool)
+    jump[ok[1:]] = close & (step > max_jump)
+
+    flags[idx] = out * OUT_OF_RANGE | flat * FLATLINE | jump * JUMP
+    return flags
+
+
+class QualityMask:
+    """Per-column artifact flags for deidentified_data.csv, built once.
+
+    flags[col] is a uint8 array in the data's row order (bits in FLAGS).
+    ok(col) is the boolean "not flagged" mask that the NaN-based validity
+    masks downstream can be ANDed with; apply(data)
+    returns a copy with the rejected readings set to NaN, so every existing
+    analysis picks the filter up without changes.
+    """
+
+    def __init__(self, flags, tone):
+        self.flags = flags
+        self.tone = tone
+
+    @classmethod
+    def build(cls, data, columns=DEVICES, limits=HR_LIMITS, flatline=FLATLINE_READINGS,
+              max_jump=MAX_JUMP, max_gap=MAX_GAP, device_flatline=DEVICE_FLATLINE,
+              device_max_jump=DEVICE_MAX_JUMP):
+        """Flags for each of columns (the wearables by default, not the ECG reference).
+
+        flatline and max_jump apply to every column unless device_flatline /
+        device_max_jump give a column its own value.
+        """
+        codes = pd.factorize(data['ID'])[0]
+        # Each participant's rows contiguous and in their original order
+        order = np.argsort(codes, kind='stable')
+        flags = {}
+        for col in columns:
+            values = np.asarray(data[col], dtype=float)[order]
+            flags[col] = np.empty(len(order), dtype=np.uint8)
+            flags[col][order] = quality_flags(values, codes[order], limits, device_flatline.get(col, flatline),
+                                              device_max_jump.get(col, max_jump), max_gap)
+        return cls(flags, np.asarray(data['Skin Tone'], dtype=float))
+
+    def rejected(self, col):
+        return self.flags[col] != 0
+
+    def ok(self, col):
+        # AND with a "not NaN" mask to get the usable readings
+        return self.flags[col] == 0
+
+    def apply(self, data):
+        data = data.copy()
+        for col in self.flags:
+            data[col] = data[col].mask(self.rejected(col))
+        return data
+
+    def rejection_rates(self, data):
+        """Readings and percentage rejected per column and skin tone, overall and by reason.
+
+        A reading can carry several flags, so the reasons may add up to more
+        than the rejected total.
+        """
+        tables = []
+        for col, flags in self.flags.items():
+            present = ~np.isnan(np.asarray(data[col], dtype=float))
+            frame = pd.DataFrame({'Skin Tone': self.tone[present], 'rejected': flags[present] != 0})
+            for name, bit in FLAGS.items():
+                frame[name] = (flags[present] & bit) != 0
+            stats = frame.groupby('Skin Tone').agg(readings=('rejected', 'size'), **{
+                f'{name}_%': (name, 'mean') for name in ['rejected', *FLAGS]})
+            stats[[c for c in stats.columns if c.endswith('_%')]] *= 100
+            stats.insert(0, 'device', col)
+            tables.append(stats.reset_index())
+        table = pd.concat(tables, ignore_index=True)
+        return table[['device', 'Skin Tone', *table.columns.drop(['device', 'Skin Tone'])]]
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='Flag out-of-range, flatline and jump artifacts in each wearable HR column')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--limits', type=float, nargs=2, default=HR_LIMITS, metavar=('LOW', 'HIGH'))
+    parser.add_argument('--flatline', type=int, default=FLATLINE_READINGS, help='identical readings in a row')
+    parser.add_argument('--max-jump', type=float, default=MAX_JUMP, help='bpm between consecutive readings')
+    parser.add_argument('--max-gap', type=int, default=MAX_GAP, help='rows; larger gaps are not checked for jumps')
+    parser.add_argument('--out', default='bent_rejection_rates.csv')
+    args = parser.parse_args()
+
+    data = load_data(args.csv)
+    quality = QualityMask.build(data, list(data.columns[1:7]), limits=args.limits, flatline=args.flatline,
+                                max_jump=args.max_jump, max_gap=args.max_gap)
+    rates = quality.rejection_rates(data)
+    rates.to_csv(args.out, index=False)
+    print(f"Rejection rates by device and skin tone saved to '{args.out}'\n")
+    print(rates.round(3).to_string(index=False))
@@ -0,0 +1,34 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def share_arrays(arrays):
+    """Copy a dict of 1-D arrays into one shared memory block.
+
+    Returns the SharedMemory handle (the caller must close and unlink it) and
+    a small picklable layout {key: (dtype, offset, length)} that workers pass
+    to ``attach_arrays`` to get zero-copy views of the same data.
+    """
+    layout = {}
+    offset = 0
+    for key, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        # Keep every array 8-byte aligned inside the block
+        offset = (offset + 7) // 8 * 8
+        layout[key] = (values.dtype.str, offset, len(values))
+        offset += values.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for key, values in arrays.items():
+        dtype, start, length = layout[key]
+        np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)[:] = values
+    return shm, layout
+
+
+def attach_arrays(name, layout):
+    # Views into an existing block; keep the returned handle alive while they are used
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {key: np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)
+              for key, (dtype, start, length) in layout.items()}
+    return shm, arrays
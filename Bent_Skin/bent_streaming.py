@@ -0,0 +1,201 @@
+import argparse
+import os
+
+import numpy as np
+from scipy import stats
+
+from bent_index import SelectionIndex
+from bent_loader import BENT_SCHEMA, read_with_schema
+
+# Strata reported by Bent_analysis.py
+STRATA = ('overall', 'lighter', 'darker')
+# ECG histogram bins used by Figures 4-5 and Figure 6
+HIST_BINS = {'10 bpm': np.arange(40, 180, 10), '5 bpm': np.arange(40, 180, 5)}
+
+
+class PearsonStats:
+    """Mergeable sufficient statistics for Pearson's r between x and y.
+
+    Stored as counts, means and centred sums of squares/cross-products and
+    combined with the pairwise (Chan et al.) form of Welford's update, which
+    stays accurate when HR values are large relative to their spread. The raw
+    sums (sum_x, sum_xx, sum_xy, ...) are available as properties.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        s = cls()
+        s.n = len(x)
+        if s.n:
+            s.mean_x = float(np.mean(x))
+            s.mean_y = float(np.mean(y))
+            dx = x - s.mean_x
+            dy = y - s.mean_y
+            s.m2_x = float(dx @ dx)
+            s.m2_y = float(dy @ dy)
+            s.c_xy = float(dx @ dy)
+        return s
+
+    def update(self, x, y):
+        self.merge(PearsonStats.from_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+        return self
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        w = self.n * other.n / n
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.m2_x += other.m2_x + dx * dx * w
+        self.m2_y += other.m2_y + dy * dy * w
+        self.c_xy += other.c_xy + dx * dy * w
+        self.n = n
+        return self
+
+    @property
+    def sum_x(self):
+        return self.n * self.mean_x
+
+    @property
+    def sum_y(self):
+        return self.n * self.mean_y
+
+    @property
+    def sum_xx(self):
+        return self.m2_x + self.n * self.mean_x ** 2
+
+    @property
+    def sum_yy(self):
+        return self.m2_y + self.n * self.mean_y ** 2
+
+    @property
+    def sum_xy(self):
+        return self.c_xy + self.n * self.mean_x * self.mean_y
+
+    def r(self):
+        if self.n < 2 or self.m2_x == 0 or self.m2_y == 0:
+            return np.nan
+        return float(np.clip(self.c_xy / np.sqrt(self.m2_x * self.m2_y), -1.0, 1.0))
+
+    def p(self):
+        # Two-sided test of r = 0, the same test scipy.stats.pearsonr reports
+        return pearson_p(self.r(), self.n)
+
+    def result(self):
+        return {'r': self.r(), 'p': self.p(), 'n': self.n}
+
+
+def pearson_p(r, n):
+    r = np.asarray(r, dtype=float)
+    n = np.asarray(n, dtype=float)
+    df = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), df)
+    p = np.where(np.abs(r) == 1, 0.0, p)
+    p = np.where(df > 0, p, np.nan)
+    return float(p) if p.ndim == 0 else p
+
+
+class HistogramCounts:
+    """Mergeable histogram counts over fixed bin edges (np.histogram semantics)."""
+
+    def __init__(self, bins):
+        self.bins = np.asarray(bins, dtype=float)
+        self.counts = np.zeros(len(self.bins) - 1, dtype=np.int64)
+
+    def update(self, values):
+        self.counts += np.histogram(values, bins=self.bins)[0]
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+
+class StreamingAnalysis:
+    """Per-(device, stratum) Pearson statistics plus per-device ECG histograms.
+
+    Feed it DataFrame chunks with ``update`` (or combine two partial results
+    with ``merge``); nothing but the running statistics is kept between chunks.
+    """
+
+    def __init__(self, devices, strata=STRATA, hist_bins=HIST_BINS):
+        self.devices = list(devices)
+        self.strata = list(strata)
+        self.pearson = {(dev, s): PearsonStats() for dev in self.devices for s in self.strata}
+        self.hist_names = list(hist_bins)
+        self.hist = {(dev, name): HistogramCounts(bins) for dev in self.devices for name, bins in hist_bins.items()}
+        self.rows = 0
+
+    def update(self, chunk):
+        index = SelectionIndex(chunk, devices=self.devices)
+        for dev in self.devices:
+            for s in self.strata:
+                self.pearson[(dev, s)].update(*index.pair(dev, s))
+            ecg = index.ecg(dev)
+            for name in self.hist_names:
+                self.hist[(dev, name)].update(ecg)
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        for key, acc in other.pearson.items():
+            self.pearson[key].merge(acc)
+        for key, h in other.hist.items():
+            self.hist[key].merge(h)
+        self.rows += other.rows
+        return self
+
+    def correlations(self, stratum):
+        # Same layout as correlations_overall/_lighter/_darker in Bent_analysis.py
+        return {dev: self.pearson[(dev, stratum)].result() for dev in self.devices}
+
+
+def stream_csv(csv_path, chunksize=100_000, strata=STRATA, hist_bins=HIST_BINS):
+    """Read a Bent-format CSV in chunks and return the filled StreamingAnalysis."""
+    analysis = None
+    for chunk in read_with_schema(csv_path, BENT_SCHEMA, chunksize=chunksize):
+        if analysis is None:
+            analysis = StreamingAnalysis(chunk.columns[1:7], strata=strata, hist_bins=hist_bins)
+        analysis.update(chunk)
+    return analysis
+
+
+def print_summary(analysis):
+    for stratum, heading in [('overall', 'Overall Correlations'),
+                             ('lighter', 'Lighter Skin Tone Correlations'),
+                             ('darker', 'Darker Skin Tone Correlations')]:
+        print(f"\n{heading}:")
+        for dev, res in analysis.correlations(stratum).items():
+            p_text = "p < .001" if res['p'] < 0.001 else f"p = {res['p']:.3f}"
+            print(f"{dev}: r = {res['r']:.4f}, {p_text}, N = {res['n']}")
+
+    print("\nECG histogram counts (10 bpm bins from 40 bpm):")
+    for dev in analysis.devices:
+        print(f"{dev:<15} {analysis.hist[(dev, '10 bpm')].counts.tolist()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Chunked, bounded-memory version of the Bent correlations and histograms')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    result = stream_csv(args.csv, chunksize=args.chunksize)
+    print(f"Streamed {result.rows} rows in chunks of {args.chunksize}")
+    print_summary(result)
@@ -0,0 +1,109 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from bent_index import DEVICES
+
+
+def window_starts(ids, window, step):
+    """Start rows of every full window that stays inside one participant's block.
+
+    ids must already be grouped (all rows of an ID contiguous). Returns the
+    start row of each window, built without a loop over participants.
+    """
+    boundaries = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1], True])
+    seg_start, seg_end = boundaries[:-1], boundaries[1:]
+    counts = np.maximum((seg_end - seg_start - window) // step + 1, 0)
+    # Offset of each window inside its block: 0, step, 2*step, ...
+    first = np.repeat(seg_start, counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return first + k * step
+
+
+def _cumulative(values):
+    # Prefix sums with a leading 0 so sum(values[a:b]) == c[b] - c[a]
+    return np.concatenate([[0.0], np.cumsum(values)])
+
+
+def rolling_device_error(data, devices=DEVICES, window=60, step=10, min_pairs=10):
+    """Rolling bias, MAE and Pearson r of each device against ECG within each ID.
+
+    Windows are window rows long and start every step rows; they never cross
+    from one participant into the next. Each window's sums come from prefix
+    sums (cumsum differences), so the cost is O(rows) for any window length.
+    Rows where the device or ECG is missing are left out of the window's
+    statistics; windows with fewer than min_pairs pairs get NaN metrics.
+    Returns one row per (device, window) with the ID, Skin Tone and the
+    Activity at the window's midpoint for later aggregation.
+    """
+    # Keep each participant's rows contiguous and in their original order
+    order = np.argsort(pd.factorize(data['ID'])[0], kind='stable')
+    data = data.iloc[order]
+    ids = pd.factorize(data['ID'])[0]
+    starts = window_starts(ids, window, step)
+    ends = starts + window
+    mid = starts + window // 2
+
+    ecg = np.asarray(data['ECG'], dtype=float)
+    tables = []
+    for dev in devices:
+        x = np.asarray(data[dev], dtype=float)
+        valid = ~np.isnan(x) & ~np.isnan(ecg)
+        # Centre on the overall means so the prefix sums of squares stay small
+        dx = np.where(valid, x - np.nanmean(x[valid]) if valid.any() else 0.0, 0.0)
+        dy = np.where(valid, ecg - np.nanmean(ecg[valid]) if valid.any() else 0.0, 0.0)
+        diff = np.where(valid, x - ecg, 0.0)
+
+        sums = {}
+        for name, values in [('n', valid.astype(float)), ('x', dx), ('y', dy), ('xx', dx * dx),
+                             ('yy', dy * dy), ('xy', dx * dy), ('d', diff), ('ad', np.abs(diff))]:
+            c = _cumulative(values)
+            sums[name] = c[ends] - c[starts]
+
+        n = np.rint(sums['n'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bias = sums['d'] / n
+            mae = sums['ad'] / n
+            cov = sums['xy'] - sums['x'] * sums['y'] / n
+            var_x = sums['xx'] - sums['x'] ** 2 / n
+            var_y = sums['yy'] - sums['y'] ** 2 / n
+            r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        too_few = n < min_pairs
+        bias[too_few] = mae[too_few] = r[too_few] = np.nan
+
+        tables.append(pd.DataFrame({
+            'device': dev,
+            'ID': data['ID'].to_numpy()[starts],
+            'Skin Tone': data['Skin Tone'].to_numpy()[starts],
+            'Activity': data['Activity'].to_numpy()[mid],
+            'start': order[starts],
+            'n': n.astype(int),
+            'bias': bias, 'mae': mae, 'r': r}))
+    return pd.concat(tables, ignore_index=True)
+
+
+def summarise_windows(windows, by=('Activity',)):
+    # Mean of the per-window metrics by device and the given keys
+    return (windows.groupby(['device', *by], sort=True)[['bias', 'mae', 'r']]
+            .agg(['mean', 'median', 'count']))
+
+
+if __name__ == '__main__':
+    from bent_loader import load_data
+
+    parser = argparse.ArgumentParser(description='Rolling device-vs-ECG error over the time-synced rows of each participant')
+    parser.add_argument('csv', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'deidentified_data.csv'))
+    parser.add_argument('--window', type=int, default=60, help='window length in rows')
+    parser.add_argument('--step', type=int, default=10, help='rows between window starts')
+    parser.add_argument('--out', default='bent_rolling_error.csv')
+    args = parser.parse_args()
+
+    data = load_data(args.csv)
+    windows = rolling_device_error(data, data.columns[1:7], window=args.window, step=args.step)
+    windows.to_csv(args.out, index=False)
+    print(f"{len(windows)} device x window rows (window {args.window}, step {args.step}) saved to '{args.out}'")
+    for by in [('Activity',), ('Skin Tone',)]:
+        print(f"\nRolling error by {by[0]}:")
+        print(summarise_windows(windows, by).xs('mean', axis=1, level=1).round(3).to_string())
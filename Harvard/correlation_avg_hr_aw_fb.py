@@ -1,40 +1,68 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import sys
+
 from scipy.stats import pearsonr
 
+# Stage timing/memory tracing shared with the Bent scripts (repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from regression_plot import plot_regression
+from schemas import HARVARD_SCHEMA, read_with_schema
+
 # Load the data from the CSV file
 file_path = "/Users/chris/Documents/Keele/Year 4/Semester 3/Project (Dissertaion) /Datasets (not GitHub)/processed_participant_data.csv"
-df = pd.read_csv(file_path)
 
-# Perform and report the correlation
-corr, p_value = pearsonr(df['heart_rate_AW'], df['heart_rate_FB'])
 
-print(f"Pearson correlation (r) = {corr:.2f}")
-print(f"p-value = {p_value:.3f}")
+def correlate(df):
+    # Perform and report the correlation
+    corr, p_value = pearsonr(df['heart_rate_AW'], df['heart_rate_FB'])
+
+    print(f"Pearson correlation (r) = {corr:.2f}")
+    print(f"p-value = {p_value:.3f}")
+    return corr, p_value
+
+
+def plot(df, corr, p_value, prediction=False, n_boot=0, seed=0, workers=None):
+    # matplotlib is only needed here, so the pipeline and CLI don't pay for
+    # importing it when only the correlation is wanted
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.grid(True, color='0.9')
+    ax.set_axisbelow(True)
+
+    # Scatter plot with the OLS regression line and its 95% confidence band,
+    # computed in closed form (n_boot > 0 bootstraps the band instead, as
+    # seaborn's regplot did); prediction=True also outlines the 95% band for
+    # a single new participant
+    # The x and y variables are the Fitbit and Apple Watch heart rates
+    plot_regression(ax, df['heart_rate_FB'], df['heart_rate_AW'], level=0.95, prediction=prediction,
+                    n_boot=n_boot, seed=seed, workers=workers)
 
-# Create the scatter plot with a regression line
-sns.set_style("whitegrid")
-plt.figure(figsize=(10, 8))
+    # Add titles and labels for clarity
+    plt.title('Relationship Between Apple Watch and Fitbit Heart Rate Measurements', fontsize=16)
+    plt.xlabel('Average Fitbit Heart Rate (BPM)', fontsize=12)
+    plt.ylabel('Average Apple Watch Heart Rate (BPM)', fontsize=12)
 
-# Create the scatter plot with a regression line using seaborn's regplot
-# The 'ci=95' adds a 95% confidence interval band around the regression line
-# The x and y variables are the Apple Watch and Fitbit heart rates
-plot = sns.regplot(x='heart_rate_FB', y='heart_rate_AW', data=df, ci=95,
-                   line_kws={'color': 'red'}, scatter_kws={'alpha': 0.7})
+    # Set the limits to make the plot's scale clearer and symmetrical if needed
+    plt.xlim(0, 150)
+    plt.ylim(0, 150)
 
-# Add titles and labels for clarity
-plt.title('Relationship Between Apple Watch and Fitbit Heart Rate Measurements', fontsize=16)
-plt.xlabel('Average Fitbit Heart Rate (BPM)', fontsize=12)
-plt.ylabel('Average Apple Watch Heart Rate (BPM)', fontsize=12)
+    # Add a text box with the correlation and p-value for easy viewing
+    plt.text(120, 20, f'r = {corr:.2f}\np = {p_value:.3f}', fontsize=12,
+             bbox=dict(boxstyle='round,pad=0.5', fc='white', ec='gray', alpha=0.9))
+    return fig
 
-# Set the limits to make the plot's scale clearer and symmetrical if needed
-plt.xlim(0, 150)
-plt.ylim(0, 150)
 
-# Add a text box with the correlation and p-value for easy viewing
-plt.text(120, 20, f'r = {corr:.2f}\np = {p_value:.3f}', fontsize=12,
-         bbox=dict(boxstyle='round,pad=0.5', fc='white', ec='gray', alpha=0.9))
+if __name__ == '__main__':
+    with stage('csv load') as st:
+        df = read_with_schema(file_path, HARVARD_SCHEMA)
+        st.rows = len(df)
+    with stage('correlation', rows=len(df)):
+        corr, p_value = correlate(df)
+    with stage('regression plot', rows=len(df)):
+        plot(df, corr, p_value)
 
-# Display the plot
-plt.show()
\ No newline at end of file
+    # Display the plot
+    import matplotlib.pyplot as plt
+    plt.show()
@@ -1,40 +1,82 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
-from scipy.stats import pearsonr
+from scipy import stats
+
+# Stage timing/memory tracing shared with the Bent scripts (repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from schemas import HARVARD_SCHEMA, read_with_schema
+
 # Load the data from the CSV file
 file_path = "/Users/chris/Documents/Keele/Year 4/Semester 3/Project (Dissertaion) /Datasets (not GitHub)/participant_summary_corrected.csv"
-df = pd.read_csv(file_path)
-
-# Get a list of all unique activities in the dataset
-activities = df['activity'].unique()
-print(f"Activities found: {activities}")
-print("-" * 50)
-
-# A dictionary to store the correlation results for each activity
-correlation_results = {}
-
-# Loop through each activity to calculate the correlation 
-for activity in activities:
-    # Filter the DataFrame to get only the current activity's data
-    activity_df = df[df['activity'] == activity].copy()
-
-    # Separate the data into Apple Watch and Fitbit groups
-    aw_data = activity_df[activity_df['device'] == 'AW']['heart_rate']
-    fb_data = activity_df[activity_df['device'] == 'FB']['heart_rate']
-
-    # Ensure both lists have the same number of data points
-    if len(aw_data) == len(fb_data):
-        # Calculate the Pearson correlation coefficient and p-value
-        r, p = pearsonr(aw_data, fb_data)
-        correlation_results[activity] = {'r': r, 'p': p}
-
-# Print the results in a structured format
-print("Correlation Results by Activity:")
-for activity, results in correlation_results.items():
-    r = results['r']
-    p = results['p']
-    
-    # Check for statistical significance
-    significance = "Statistically Significant" if p < 0.05 else "Not Statistically Significant"
-    
-    print(f"Activity: {activity:<15} | r = {r:.2f} | p = {p:.3f} | {significance}")
 
+
+def grouped_pearson(paired, group_col, x_col, y_col):
+    """Pearson r, n and p of x vs y within every group, in one groupby reduction.
+
+    Rows missing either value are dropped first (pairwise-complete). Returns
+    a DataFrame indexed by group with columns r, n and p.
+    """
+    paired = paired[paired[x_col].notna() & paired[y_col].notna()]
+    x = paired[x_col].to_numpy(dtype=float)
+    y = paired[y_col].to_numpy(dtype=float)
+    # Centre within each group first so the sums below don't cancel
+    keys = paired[group_col]
+    dx = x - paired.groupby(group_col, sort=False, observed=True)[x_col].transform('mean').to_numpy()
+    dy = y - paired.groupby(group_col, sort=False, observed=True)[y_col].transform('mean').to_numpy()
+    sums = (pd.DataFrame({'n': 1, 'xx': dx * dx, 'yy': dy * dy, 'xy': dx * dy}, index=paired.index)
+            .groupby(keys, sort=False, observed=True).sum())
+
+    n = sums['n'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.clip(sums['xy'] / np.sqrt(sums['xx'] * sums['yy']), -1.0, 1.0).to_numpy()
+        t = r * np.sqrt((n - 2) / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), n - 2)
+    p = np.where(np.abs(r) == 1, 0.0, p)
+    # Same conventions as scipy.stats.pearsonr for the smallest samples
+    r = np.where(n < 2, np.nan, r)
+    p = np.where(n == 2, 1.0, np.where(n < 2, np.nan, p))
+    return pd.DataFrame({'r': r, 'n': n.astype(int), 'p': p}, index=sums.index)
+
+
+def correlate_by_activity(df):
+    # Get a list of all unique activities in the dataset
+    activities = np.asarray(df['activity'].unique())
+    print(f"Activities found: {activities}")
+    print("-" * 50)
+
+    # Pivot once so each (participant, activity) row holds its AW and FB values
+    # side by side; AW and FB are then paired by participant rather than by
+    # position, and activities where some participants lack one device are
+    # kept with the participants that have both
+    paired = df.pivot_table(index=['participant_id', 'activity'], columns='device',
+                            values='heart_rate', aggfunc='mean', observed=True).reset_index()
+    results = grouped_pearson(paired, 'activity', 'AW', 'FB')
+    results = results.reindex([a for a in activities if a in results.index])
+
+    # A dictionary to store the correlation results for each activity
+    correlation_results = {activity: {'r': row['r'], 'p': row['p'], 'n': int(row['n'])}
+                           for activity, row in results.iterrows() if row['n'] >= 2}
+
+    # Print the results in a structured format
+    print("Correlation Results by Activity:")
+    for activity, results in correlation_results.items():
+        r = results['r']
+        p = results['p']
+
+        # Check for statistical significance
+        significance = "Statistically Significant" if p < 0.05 else "Not Statistically Significant"
+
+        print(f"Activity: {activity:<15} | r = {r:.2f} | p = {p:.3f} | n = {results['n']:<4} | {significance}")
+    return correlation_results
+
+
+if __name__ == '__main__':
+    with stage('csv load') as st:
+        df = read_with_schema(file_path, HARVARD_SCHEMA)
+        st.rows = len(df)
+    with stage('correlations by activity', rows=len(df)):
+        correlate_by_activity(df)
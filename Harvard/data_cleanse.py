@@ -1,93 +1,131 @@
-import pandas as pd
+import os
+import sys
+
+import numpy as np
+
+# Stage timing/memory tracing shared with the Bent scripts (repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from schemas import HARVARD_SCHEMA, memory_report, read_with_schema
 
 #  Load dataset 
 file_path = "/Users/chris/Documents/Keele/Year 4/Semester 3/Project (Dissertaion) /Data/Harvard/aw_fb_cleansed.csv"
-df = pd.read_csv(file_path)
-
-print("=== ORIGINAL DATA CHECK ===")
-print("First few rows:")
-print(df.head())
-print(f"\nDataset shape: {df.shape}")
+output_path = "participant_summary_corrected.csv"
 
 #  Create participant groups and assign IDs based on ORDER OF FIRST APPEARANCE 
-# Get unique participant combinations in the order they first appear
-unique_participants = (
-    df.drop_duplicates(subset=['BMI', 'gender', 'age'])
-    [['BMI', 'gender', 'age']]
-    .reset_index(drop=True)
-)
-
-print(f"\n=== PARTICIPANT ORDER ===")
-print("Participants in order of first appearance:")
-print(unique_participants.head(10))
-
-# Create participant_group mapping based on order of appearance
-participant_mapping = unique_participants.copy()
-participant_mapping['participant_group'] = range(1, len(participant_mapping) + 1)
-
-# Merge this mapping back to the main dataframe
-df = df.merge(participant_mapping, on=['BMI', 'gender', 'age'], how='left')
-
-#  Assign participant IDs consistently across devices 
-# Create ID mapping for both devices, maintaining the same numbering
-id_map_list = []
-for device in ['AW', 'FB']:
-    device_map = participant_mapping.copy()
-    device_map['device'] = device
-    device_map['participant_id'] = device_map['participant_group']  # Same ID as group number
-    id_map_list.append(device_map[['device', 'participant_group', 'participant_id']])
-
-id_map = pd.concat(id_map_list, ignore_index=True)
-
-# Merge back the participant IDs
-df = df.merge(id_map[['device', 'participant_group', 'participant_id']], 
-              on=['device', 'participant_group'], how='left')
-
-# --- Verification ---
-print(f"\n=== PARTICIPANT ID VERIFICATION ===")
-verification = (
-    df[['participant_id', 'BMI', 'gender', 'age', 'device']]
-    .drop_duplicates()
-    .sort_values(['participant_id', 'device'])
-)
-print("First 10 participant assignments:")
-print(verification.head(20))
-
-# Check specific participants
-participant_1 = verification[verification['participant_id'] == 1].iloc[0]
-participant_2 = verification[verification['participant_id'] == 2].iloc[0]
-
-print(f"\nParticipant 1: Age {participant_1['age']}, BMI {participant_1['BMI']}, Gender {participant_1['gender']}")
-print(f"Participant 2: Age {participant_2['age']}, BMI {participant_2['BMI']}, Gender {participant_2['gender']}")
-
-#  Aggregate average HR per participant/activity 
-print(f"\n=== AGGREGATING DATA ===")
-summary_df = (
-    df.groupby(['device', 'participant_id', 'gender', 'age', 'BMI', 'activity'], as_index=False)
-    .agg(heart_rate=('heart_rate', 'mean'))
-)
-
-# --- Reorder columns ---
-summary_df = summary_df[['participant_id', 'gender', 'age', 'BMI', 'heart_rate', 'device', 'activity']]
-
-# --- Verification of final output ---
-print(f"Summary dataframe shape: {summary_df.shape}")
-print("First few rows of summary:")
-print(summary_df.head(12))
-
-# Check if BMI values are correct for first two participants
-p1_rows = summary_df[summary_df['participant_id'] == 1]
-p2_rows = summary_df[summary_df['participant_id'] == 2]
-
-if len(p1_rows) > 0:
-    print(f"\nParticipant 1 BMI in output: {p1_rows['BMI'].iloc[0]}")
-    print(f"Participant 1 Age in output: {p1_rows['age'].iloc[0]}")
-
-if len(p2_rows) > 0:
-    print(f"Participant 2 BMI in output: {p2_rows['BMI'].iloc[0]}")
-    print(f"Participant 2 Age in output: {p2_rows['age'].iloc[0]}")
-
-# --- Save to CSV ---
-output_path = "participant_summary_corrected.csv"
-summary_df.to_csv(output_path, index=False)
-print(f"\nAnalysis complete. Results saved to {output_path}")
\ No newline at end of file
+# The (BMI, gender, age) key is factorized once into integer codes numbered in
+# order of first appearance (groupby(sort=False).ngroup()), which replaces the
+# drop_duplicates + merge + per-device merge steps with a single vectorized pass
+KEY_COLS = ['BMI', 'gender', 'age']
+DEVICES = ['AW', 'FB']
+
+
+def assign_participant_ids(df):
+    """Add participant_group/participant_id (1-based, first-appearance order).
+
+    Returns the frame with the two new columns and the table of unique
+    participants in ID order. participant_id is only set for AW/FB rows,
+    matching the original device mapping.
+    """
+    codes = df.groupby(KEY_COLS, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    first_rows = np.unique(codes, return_index=True)[1]
+    unique_participants = df[KEY_COLS].iloc[first_rows].reset_index(drop=True)
+
+    df = df.copy()
+    df['participant_group'] = codes + 1
+    on_device = df['device'].isin(DEVICES).to_numpy()
+    df['participant_id'] = codes + 1 if on_device.all() else np.where(on_device, codes + 1, np.nan)
+    return df, unique_participants
+
+
+def summarise_heart_rate(df, unique_participants):
+    # Mean HR per device/participant/activity. participant_id already determines
+    # gender/age/BMI, so the groupby only needs the integer ID plus categorical
+    # device and activity codes; the demographics are gathered back afterwards.
+    keep = df['participant_id'].notna() & df['activity'].notna() & df[KEY_COLS].notna().all(axis=1)
+    sub = df.loc[keep, ['device', 'participant_id', 'activity', 'heart_rate']]
+    summary = (
+        sub['heart_rate']
+        .groupby([sub['device'].astype('category'), sub['participant_id'],
+                  sub['activity'].astype('category')], observed=True, sort=True)
+        .mean()
+        .reset_index()
+    )
+    summary['device'] = summary['device'].astype(df['device'].dtype)
+    summary['activity'] = summary['activity'].astype(df['activity'].dtype)
+    summary['participant_id'] = summary['participant_id'].astype(df['participant_id'].dtype)
+
+    demographics = unique_participants.iloc[summary['participant_id'].astype(int).to_numpy() - 1].reset_index(drop=True)
+    for col in KEY_COLS:
+        summary[col] = demographics[col].to_numpy()
+    return summary
+
+
+def cleanse(df):
+    """Raw AW/FB export -> one mean HR per device/participant/activity."""
+    print("=== ORIGINAL DATA CHECK ===")
+    print("First few rows:")
+    print(df.head())
+    print(f"\nDataset shape: {df.shape}")
+
+    df, unique_participants = assign_participant_ids(df)
+
+    print(f"\n=== PARTICIPANT ORDER ===")
+    print("Participants in order of first appearance:")
+    print(unique_participants.head(10))
+
+    # --- Verification ---
+    print(f"\n=== PARTICIPANT ID VERIFICATION ===")
+    # One row per (participant, device) pair, read off the integer codes
+    pairs = df.loc[df['participant_id'].notna(), ['participant_id', 'device']].drop_duplicates()
+    verification = pairs.join(unique_participants, on=pairs['participant_id'].astype(int) - 1)
+    verification = verification[['participant_id', 'BMI', 'gender', 'age', 'device']].sort_values(['participant_id', 'device'])
+    print("First 10 participant assignments:")
+    print(verification.head(20))
+
+    # Check specific participants
+    participant_1 = verification[verification['participant_id'] == 1].iloc[0]
+    participant_2 = verification[verification['participant_id'] == 2].iloc[0]
+
+    print(f"\nParticipant 1: Age {participant_1['age']}, BMI {participant_1['BMI']}, Gender {participant_1['gender']}")
+    print(f"Participant 2: Age {participant_2['age']}, BMI {participant_2['BMI']}, Gender {participant_2['gender']}")
+
+    #  Aggregate average HR per participant/activity 
+    print(f"\n=== AGGREGATING DATA ===")
+    summary_df = summarise_heart_rate(df, unique_participants)
+
+    # --- Reorder columns ---
+    summary_df = summary_df[['participant_id', 'gender', 'age', 'BMI', 'heart_rate', 'device', 'activity']]
+
+    # --- Verification of final output ---
+    print(f"Summary dataframe shape: {summary_df.shape}")
+    print("First few rows of summary:")
+    print(summary_df.head(12))
+
+    # Check if BMI values are correct for first two participants
+    p1_rows = summary_df[summary_df['participant_id'] == 1]
+    p2_rows = summary_df[summary_df['participant_id'] == 2]
+
+    if len(p1_rows) > 0:
+        print(f"\nParticipant 1 BMI in output: {p1_rows['BMI'].iloc[0]}")
+        print(f"Participant 1 Age in output: {p1_rows['age'].iloc[0]}")
+
+    if len(p2_rows) > 0:
+        print(f"Participant 2 BMI in output: {p2_rows['BMI'].iloc[0]}")
+        print(f"Participant 2 Age in output: {p2_rows['age'].iloc[0]}")
+
+    return summary_df
+
+
+if __name__ == '__main__':
+    with stage('csv load') as st:
+        df = read_with_schema(file_path, HARVARD_SCHEMA)
+        st.rows = len(df)
+    print(memory_report(df, 'aw_fb_cleansed'))
+    with stage('cleanse', rows=len(df)):
+        summary_df = cleanse(df)
+
+    # --- Save to CSV ---
+    with stage('csv write', rows=len(summary_df)):
+        summary_df.to_csv(output_path, index=False)
+    print(f"\nAnalysis complete. Results saved to {output_path}")
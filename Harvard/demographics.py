@@ -1,22 +1,44 @@
-import pandas as pd
-
-# Load the processed participant data
-df_participants = pd.read_csv('processed_participant_data.csv')
-
-# Calculate descriptive statistics for Age and BMI
-age_bmi_stats = df_participants[['age', 'BMI']].agg(['mean', 'std'])
-age_bmi_stats_rounded = age_bmi_stats.round(2)
-print("--- Mean and Standard Deviation for Age and BMI ---")
-print(age_bmi_stats_rounded)
-
-# Calculate the counts for Gender
-gender_counts = df_participants['gender'].value_counts()
-print("\n Gender Counts")
-print(gender_counts)
-print(f"Total participants: {len(df_participants)}")
-
-# Save the statistics to CSV files
-age_bmi_stats_rounded.to_csv('age_bmi_descriptive_stats.csv')
-gender_counts.to_csv('gender_counts.csv')
-print("\nDescriptive statistics for Age and BMI saved to age_bmi_descriptive_stats.csv")
-print("Gender counts saved to gender_counts.csv")
\ No newline at end of file
+import os
+import sys
+
+# Stage timing/memory tracing shared with the Bent scripts (repository root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import stage
+from schemas import HARVARD_SCHEMA, read_with_schema
+
+input_path = 'processed_participant_data.csv'
+
+
+def describe(df_participants):
+    """Mean/SD of age and BMI plus gender counts for the processed participants."""
+    # Calculate descriptive statistics for Age and BMI
+    age_bmi_stats = df_participants[['age', 'BMI']].agg(['mean', 'std'])
+    age_bmi_stats_rounded = age_bmi_stats.round(2)
+    print("--- Mean and Standard Deviation for Age and BMI ---")
+    print(age_bmi_stats_rounded)
+
+    # Calculate the counts for Gender
+    gender_counts = df_participants['gender'].value_counts()
+    print("\n Gender Counts")
+    print(gender_counts)
+    print(f"Total participants: {len(df_participants)}")
+    return age_bmi_stats_rounded, gender_counts
+
+
+def save(age_bmi_stats_rounded, gender_counts, out_dir='.'):
+    # Save the statistics to CSV files
+    with stage('csv write'):
+        age_bmi_stats_rounded.to_csv(os.path.join(out_dir, 'age_bmi_descriptive_stats.csv'))
+        gender_counts.to_csv(os.path.join(out_dir, 'gender_counts.csv'))
+    print("\nDescriptive statistics for Age and BMI saved to age_bmi_descriptive_stats.csv")
+    print("Gender counts saved to gender_counts.csv")
+
+
+if __name__ == '__main__':
+    # Load the processed participant data
+    with stage('csv load') as st:
+        df_participants = read_with_schema(input_path, HARVARD_SCHEMA)
+        st.rows = len(df_participants)
+    with stage('descriptive statistics', rows=len(df_participants)):
+        results = describe(df_participants)
+    save(*results)
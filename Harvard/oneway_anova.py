@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+def quantile_groups(values, q=2, labels=None):
+    """pd.qcut split of a continuous column (q=2 median, 3 tertiles, 4 quartiles, ...)."""
+    if labels is None:
+        labels = [f'Q{k + 1}' for k in range(q)] if q != 2 else ['Low', 'High']
+    return pd.qcut(values, q=q, labels=labels)
+
+
+def oneway_anova(df, value_col, factors):
+    """One-way ANOVA of value_col for many grouping columns at once.
+
+    factors is a list of column names or a {name: Series} mapping (e.g. qcut
+    splits from quantile_groups). Each factor costs one groupby giving group
+    counts, means and variances; F, p and eta-squared follow in closed form.
+    For a single factor this is the same model as
+    anova_lm(ols('y ~ C(factor)'), typ=2), including its handling of missing
+    values. Returns one row per factor.
+    """
+    if not isinstance(factors, dict):
+        factors = {name: df[name] for name in factors}
+
+    rows = []
+    for name, groups in factors.items():
+        groups = pd.Series(groups, index=df.index)
+        keep = df[value_col].notna() & groups.notna()
+        y = df.loc[keep, value_col].astype(float)
+        g = groups[keep]
+
+        summary = y.groupby(g, observed=True).agg(['count', 'mean', 'var'])
+        n_g = summary['count'].to_numpy(dtype=float)
+        mean_g = summary['mean'].to_numpy()
+        # Groups of one contribute no within-group variation
+        ss_within = float(np.nansum(summary['var'].to_numpy() * (n_g - 1)))
+        ss_between = float((n_g * (mean_g - y.mean()) ** 2).sum())
+
+        df_between = len(n_g) - 1
+        df_within = int(n_g.sum()) - len(n_g)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f_value = (ss_between / df_between) / (ss_within / df_within)
+        rows.append({'factor': name, 'sum_sq': ss_between, 'df': float(df_between),
+                     'F': f_value, 'PR(>F)': stats.f.sf(f_value, df_between, df_within),
+                     'residual_sum_sq': ss_within, 'residual_df': float(df_within),
+                     'eta_sq': ss_between / (ss_between + ss_within), 'n': int(n_g.sum())})
+    return pd.DataFrame(rows).set_index('factor')
+
+
+def anova_table(result, factor):
+    # One factor's row laid out like statsmodels' anova_lm output
+    row = result.loc[factor]
+    return pd.DataFrame({'sum_sq': [row['sum_sq'], row['residual_sum_sq']],
+                         'df': [row['df'], row['residual_df']],
+                         'F': [row['F'], np.nan],
+                         'PR(>F)': [row['PR(>F)'], np.nan]},
+                        index=[f'C({factor})', 'Residual'])
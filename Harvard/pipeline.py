@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# instrumentation.py, schemas.py and regression_plot.py live in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import correlation_avg_hr_aw_fb
+import correlations_by_activity
+import data_cleanse
+import demographics
+import statistical_analysis
+import instrumentation
+from instrumentation import stage
+from oneway_anova import anova_table
+from schemas import HARVARD_SCHEMA, read_with_schema
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'harvard')
+
+
+class Stage:
+    """One step of the Harvard chain: func(*outputs of inputs) -> output."""
+
+    def __init__(self, name, func, inputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+
+    def code_hash(self):
+        # The source of func's module and of every repository module it imports
+        # (directly or through other local modules), so edits to helpers such
+        # as oneway_anova.py or schemas.py mark the stage stale too
+        digest = hashlib.sha256(self.func.__qualname__.encode())
+        for path in sorted(local_modules(inspect.getmodule(self.func))):
+            with open(path, 'rb') as f:
+                digest.update(f'\n{os.path.relpath(path, ROOT)}\n'.encode() + f.read())
+        return digest.hexdigest()
+
+
+def local_modules(module, seen=None):
+    """Source files of module and every module under ROOT it imports, recursively.
+
+    Imports are found from the module's globals: imported modules, and the
+    modules that imported functions/classes come from.
+    """
+    seen = set() if seen is None else seen
+    path = getattr(module, '__file__', None)
+    if not path or not os.path.abspath(path).startswith(ROOT + os.sep) or path in seen:
+        return seen
+    seen.add(path)
+    for value in vars(module).values():
+        if inspect.ismodule(value):
+            local_modules(value, seen)
+        elif getattr(value, '__module__', None) in sys.modules:
+            local_modules(sys.modules[value.__module__], seen)
+    return seen
+
+
+# The chain that used to run through CSV files on disk:
+#   aw_fb_cleansed.csv -> data_cleanse -> statistical_analysis -> demographics / correlation
+STAGES = [
+    Stage('cleanse', data_cleanse.cleanse, ['raw']),
+    Stage('process', statistical_analysis.process_participants, ['cleanse']),
+    Stage('tests', statistical_analysis.run_tests, ['process']),
+    Stage('demographics', demographics.describe, ['process']),
+    Stage('correlation', correlation_avg_hr_aw_fb.correlate, ['process']),
+    Stage('activity_correlations', correlations_by_activity.correlate_by_activity, ['cleanse']),
+]
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def levels(stages):
+    # Group stages into waves; everything in a wave only depends on earlier waves
+    done = {'raw'}
+    remaining = list(stages)
+    waves = []
+    while remaining:
+        wave = [s for s in remaining if all(i in done for i in s.inputs)]
+        if not wave:
+            raise ValueError(f"Stages with missing or circular inputs: {[s.name for s in remaining]}")
+        waves.append(wave)
+        done.update(s.name for s in wave)
+        remaining = [s for s in remaining if s not in wave]
+    return waves
+
+
+def _cache_path(stage, key):
+    return os.path.join(CACHE_DIR, f'{stage.name}-{key[:16]}.pkl')
+
+
+def _run_stage(stage, args):
+    return stage.func(*args)
+
+
+def run(raw_path, stages=STAGES, force=False, workers=None):
+    """Run the chain, reusing cached stage outputs whose inputs and code are unchanged.
+
+    Each stage's cache key is a hash of its code and its inputs' keys (the
+    raw CSV's key is its SHA-256 plus the schema it is read with), so a change anywhere upstream marks every
+    dependent stage stale. Outputs are passed between stages in memory and
+    cached as pickles under .cache/harvard/. Stale stages in the same wave
+    (e.g. demographics and the correlations) run in parallel processes.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # The schema decides how the raw CSV is parsed, so it is part of the raw key
+    keys = {'raw': hashlib.sha256((file_hash(raw_path) + json.dumps(HARVARD_SCHEMA, sort_keys=True)).encode()).hexdigest()}
+    outputs = {}
+
+    def load_input(name):
+        if name not in outputs:
+            with stage(f'load {name}'):
+                if name == 'raw':
+                    outputs['raw'] = read_with_schema(raw_path, HARVARD_SCHEMA)
+                else:
+                    with open(_cache_path(by_name[name], keys[name]), 'rb') as f:
+                        outputs[name] = pickle.load(f)
+        return outputs[name]
+
+    by_name = {s.name: s for s in stages}
+    for wave in levels(stages):
+        stale = []
+        for s in wave:
+            keys[s.name] = hashlib.sha256(
+                '\n'.join([s.code_hash()] + [keys[i] for i in s.inputs]).encode()).hexdigest()
+            if force or not os.path.exists(_cache_path(s, keys[s.name])):
+                stale.append(s)
+            else:
+                print(f"[pipeline] {s.name}: up to date")
+
+        jobs = [(s, [load_input(i) for i in s.inputs]) for s in stale]
+        if len(jobs) > 1 and workers != 1:
+            with stage(' + '.join(s.name for s in stale)), ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_run_stage, *zip(*jobs)))
+        else:
+            results = []
+            for s, args in jobs:
+                with stage(s.name):
+                    results.append(_run_stage(s, args))
+
+        for s, result in zip(stale, results):
+            print(f"[pipeline] {s.name}: ran")
+            outputs[s.name] = result
+            with stage(f'cache write {s.name}'):
+                with open(_cache_path(s, keys[s.name]), 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return {s.name: load_input(s.name) for s in stages}
+
+
+def print_results(results):
+    # Stages print as they run; on a cached rerun this is the only output
+    ttest, anova = results['tests']
+    print("\n--- Paired T-test (AW vs FB) ---")
+    print(f"T-statistic: {ttest['t']:.4f}")
+    print(f"P-value: {ttest['p']:.4f}")
+    print(f"Cohen's d: {ttest['cohen_d']:.4f}")
+    for factor in anova.index:
+        print(f"\n--- ANOVA: HR_diff vs {factor} ---")
+        print(anova_table(anova, factor))
+        print(f"Eta-squared ($\\eta^2$): {anova.loc[factor, 'eta_sq']:.4f}")
+    age_bmi_stats, gender_counts = results['demographics']
+    print("\n--- Mean and Standard Deviation for Age and BMI ---")
+    print(age_bmi_stats)
+    print("\n Gender Counts")
+    print(gender_counts)
+    corr, p_value = results['correlation']
+    print(f"\nPearson correlation AW vs FB (r) = {corr:.2f}, p-value = {p_value:.3f}")
+    print("\nCorrelation Results by Activity:")
+    for activity, res in results['activity_correlations'].items():
+        print(f"Activity: {activity:<15} | r = {res['r']:.2f} | p = {res['p']:.3f} | n = {res['n']:<4}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Harvard analysis chain with cached, incremental stages')
+    parser.add_argument('raw', nargs='?', default=data_cleanse.file_path, help='aw_fb_cleansed.csv export')
+    parser.add_argument('--force', action='store_true', help='ignore the cache and re-run every stage')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--export', action='store_true',
+                        help='also write participant_summary_corrected.csv and processed_participant_data.csv')
+    parser.add_argument('--trace', action='store_true', help='record stage timings/memory to traces/ (or set ANALYSIS_TRACE=1)')
+    args = parser.parse_args()
+
+    if args.trace:
+        instrumentation.enable()
+
+    results = run(args.raw, force=args.force, workers=args.workers)
+    print_results(results)
+    if args.export:
+        results['cleanse'].to_csv(data_cleanse.output_path, index=False)
+        results['process'].to_csv(statistical_analysis.output_path, index=False)
+        print(f"Saved {data_cleanse.output_path} and {statistical_analysis.output_path}")
@@ -0,0 +1,169 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Bent_Skin'))
+sys.path.insert(0, os.path.join(ROOT, 'Harvard'))
+
+from synthetic_data import make_bent, make_harvard  # noqa: E402
+from bent_loader import load_data  # noqa: E402
+from schemas import BENT_SCHEMA, read_with_schema  # noqa: E402
+from bent_index import SelectionIndex, HR_COLUMNS  # noqa: E402
+from bent_correlation import correlation_matrix  # noqa: E402
+import data_cleanse  # noqa: E402
+import statistical_analysis  # noqa: E402
+from oneway_anova import oneway_anova, quantile_groups  # noqa: E402
+
+STRATA = ('overall', 'lighter', 'darker')
+
+
+def measure(func, memory=True):
+    """Wall/CPU time of one call, then peak traced memory from a second call."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = func()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        peak = None
+        if memory:
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    return result, {'wall_s': wall, 'cpu_s': cpu, 'peak_mb': peak}
+
+
+def bent_stages(csv_path):
+    # Each entry: (stage name, callable); later stages reuse earlier results
+    state = {}
+
+    def load_csv():
+        state['data'] = pd.read_csv(csv_path)
+        return state['data']
+
+    def load_compact():
+        return read_with_schema(csv_path, BENT_SCHEMA)
+
+    def load_cached():
+        return load_data(csv_path, verify=False)
+
+    def masking():
+        index = SelectionIndex(state['data'])
+        for dev in index.devices:
+            for s in STRATA:
+                index.rows(dev, s)
+        state['index'] = index
+        return index
+
+    def correlation():
+        index = state['index']
+        return correlation_matrix(state['data'], HR_COLUMNS, {s: index.strata[s] for s in STRATA})
+
+    def histogram():
+        index = state['index']
+        return [np.histogram(index.ecg(dev), bins=np.arange(40, 180, 10))[0] for dev in index.devices]
+
+    return [('bent_load_csv', load_csv), ('bent_load_compact', load_compact), ('bent_load_cached', load_cached),
+            ('bent_masking', masking),
+            ('bent_correlation', correlation), ('bent_histogram', histogram)]
+
+
+def harvard_stages(csv_path):
+    state = {}
+
+    def cleanse():
+        state['summary'] = data_cleanse.cleanse(pd.read_csv(csv_path))
+        return state['summary']
+
+    def anova():
+        pivoted = statistical_analysis.process_participants(state['summary'])
+        factors = {'gender': pivoted['gender'],
+                   'BMI median': quantile_groups(pivoted['BMI'], 2),
+                   'BMI tertile': quantile_groups(pivoted['BMI'], 3),
+                   'age quartile': quantile_groups(pivoted['age'], 4)}
+        return oneway_anova(pivoted, 'HR_diff', factors)
+
+    return [('harvard_cleanse', cleanse), ('harvard_anova', anova)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(scales, bent_rows, harvard_rows, memory=True, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            bent_path = os.path.join(tmp, f'bent_{scale}x', 'deidentified_data.csv')
+            harvard_path = os.path.join(tmp, f'harvard_{scale}x.csv')
+            os.makedirs(os.path.dirname(bent_path))
+            make_bent(bent_rows * scale, seed=seed).to_csv(bent_path, index=False)
+            make_harvard(harvard_rows * scale, seed=seed).to_csv(harvard_path, index=False)
+            # Build the column cache up front so bent_load_cached times the warm path
+            with contextlib.redirect_stdout(io.StringIO()):
+                load_data(bent_path, verify=False)
+
+            for rows, stages in [(bent_rows * scale, bent_stages(bent_path)),
+                                 (harvard_rows * scale, harvard_stages(harvard_path))]:
+                for name, func in stages:
+                    _, stats = measure(func, memory=memory)
+                    results.append({'scale': scale, 'stage': name, 'rows': rows, **stats})
+                    peak = f"{stats['peak_mb']:9.1f} MB" if stats['peak_mb'] is not None else ''
+                    print(f"{scale:>4}x  {name:<18} {rows:>11} rows  {stats['wall_s']:8.3f} s  {peak}")
+    return results
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r['scale'], r['stage']): r for r in baseline['results']}
+    print(f"\nComparison against {baseline_path} ({baseline.get('revision', '?')}):")
+    print(f"{'scale':>5}  {'stage':<18} {'old s':>9} {'new s':>9} {'ratio':>7}")
+    for r in current:
+        o = old.get((r['scale'], r['stage']))
+        if o is None:
+            continue
+        ratio = r['wall_s'] / o['wall_s'] if o['wall_s'] else float('nan')
+        print(f"{r['scale']:>4}x  {r['stage']:<18} {o['wall_s']:9.3f} {r['wall_s']:9.3f} {ratio:7.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time and memory-profile the Bent and Harvard stages on synthetic data')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--bent-rows', type=int, default=100_000, help='Bent rows at 1x')
+    parser.add_argument('--harvard-rows', type=int, default=6264, help='Harvard rows at 1x')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='JSON results file (default: benchmarks/results/<revision>.json)')
+    parser.add_argument('--compare', default=None, help='earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    revision = git_revision()
+    results = run(args.scales, args.bent_rows, args.harvard_rows, memory=not args.no_memory, seed=args.seed)
+
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results', f'{revision}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump({'revision': revision, 'timestamp': datetime.now(timezone.utc).isoformat(),
+                   'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                   'machine': platform.machine(), 'cpus': os.cpu_count(), 'results': results}, f, indent=1)
+    print(f"\nResults saved to {out}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,103 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DEVICES = ['Apple Watch', 'Empatica', 'Garmin', 'Fitbit', 'Miband', 'Biovotion']
+ACTIVITIES = ['Rest', 'Activity', 'Breathe', 'Type']
+HARVARD_ACTIVITIES = ['Lying', 'Sitting', 'Self Pace walk', 'Running 3 METs', 'Running 5 METs', 'Running 7 METs']
+
+# Per device: (share of rows with a reading, mean dropout length in rows,
+# noise SD in bpm). Empatica and Biovotion report at ~1 Hz so are mostly
+# present; the others report at variable rates with longer gaps.
+DEVICE_PROFILE = {'Apple Watch': (0.35, 40, 3.0),
+                  'Empatica': (0.85, 15, 6.0),
+                  'Garmin': (0.55, 30, 4.0),
+                  'Fitbit': (0.45, 30, 5.0),
+                  'Miband': (0.30, 60, 6.5),
+                  'Biovotion': (0.80, 20, 7.0)}
+
+
+def _gaps(rng, n, present, mean_gap):
+    # Alternate present/missing runs with geometric lengths so the share of
+    # present rows is about `present` and gaps come in blocks, not single rows
+    mean_on = mean_gap * present / (1 - present)
+    lengths_on = rng.geometric(1 / max(mean_on, 1), size=n // 2 + 2)
+    lengths_off = rng.geometric(1 / mean_gap, size=n // 2 + 2)
+    runs = np.column_stack([lengths_on, lengths_off]).ravel()
+    state = np.tile([True, False], len(lengths_on))
+    # Start at a random point of the first on/off cycle
+    skip = rng.integers(0, runs[0] + runs[1])
+    mask = np.repeat(state, runs)[skip:skip + n]
+    if len(mask) < n:
+        mask = np.r_[mask, np.ones(n - len(mask), dtype=bool)]
+    return mask
+
+
+def make_bent(rows=100_000, participants=None, seed=0):
+    """Synthetic frame with the deidentified_data.csv schema.
+
+    ECG plus six device HR columns with device-specific gap patterns, and
+    ID, Skin Tone (1-6, one per participant) and Activity blocks.
+    """
+    rng = np.random.default_rng(seed)
+    if participants is None:
+        participants = max(6, rows // 2000)
+    # Uneven number of rows per participant
+    weights = rng.uniform(0.5, 1.5, participants)
+    per_id = np.floor(weights / weights.sum() * rows).astype(int)
+    per_id[: rows - per_id.sum()] += 1
+    pid = np.repeat(np.arange(participants), per_id)
+    offset = np.arange(rows) - np.repeat(np.cumsum(per_id) - per_id, per_id)
+
+    # Four activity blocks per participant, in protocol order
+    activity = np.minimum(offset * 4 // np.repeat(per_id, per_id), 3)
+    baseline = rng.normal(70, 8, participants)[pid]
+    effort = np.array([0, 35, 5, 8])[activity]
+    drift = np.cumsum(rng.normal(0, 0.3, rows))
+    drift -= np.repeat(drift[np.cumsum(per_id) - per_id], per_id)
+    ecg = baseline + effort + drift + rng.normal(0, 1.5, rows)
+
+    data = {'ECG': np.where(rng.random(rows) < 0.97, ecg, np.nan)}
+    for dev in DEVICES:
+        present, mean_gap, noise = DEVICE_PROFILE[dev]
+        reading = np.round(ecg + rng.normal(0, noise, rows))
+        data[dev] = np.where(_gaps(rng, rows, present, mean_gap), reading, np.nan)
+
+    frame = pd.DataFrame(data)
+    frame['ID'] = np.char.add('p', pid.astype(str).astype('<U8'))
+    frame['Skin Tone'] = (np.arange(participants) % 6 + 1)[pid]
+    frame['Activity'] = np.array(ACTIVITIES)[activity]
+    return frame
+
+
+def make_harvard(rows=6264, participants=None, seed=0):
+    """Synthetic frame with the columns of the Harvard aw_fb_cleansed.csv export used here."""
+    rng = np.random.default_rng(seed)
+    if participants is None:
+        participants = max(4, rows // 135)
+    age = rng.integers(18, 60, participants)
+    gender = rng.integers(0, 2, participants)
+    bmi = np.round(rng.normal(24, 3.5, participants), 6)
+
+    pid = rng.integers(0, participants, rows)
+    device = rng.choice(['AW', 'FB'], rows)
+    activity = rng.integers(0, len(HARVARD_ACTIVITIES), rows)
+    heart_rate = 70 + 12 * activity + rng.normal(0, 15, rows) + np.where(device == 'AW', 0, 2)
+    return pd.DataFrame({'age': age[pid], 'gender': gender[pid], 'BMI': bmi[pid],
+                         'heart_rate': heart_rate, 'device': device,
+                         'activity': np.array(HARVARD_ACTIVITIES)[activity]})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic Bent and Harvard datasets with the real schemas')
+    parser.add_argument('--bent-rows', type=int, default=100_000)
+    parser.add_argument('--harvard-rows', type=int, default=6264)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bent-out', default='deidentified_data.csv')
+    parser.add_argument('--harvard-out', default='aw_fb_cleansed.csv')
+    args = parser.parse_args()
+
+    make_bent(args.bent_rows, seed=args.seed).to_csv(args.bent_out, index=False)
+    make_harvard(args.harvard_rows, seed=args.seed).to_csv(args.harvard_out, index=False)
+    print(f"Wrote {args.bent_out} ({args.bent_rows} rows) and {args.harvard_out} ({args.harvard_rows} rows)")
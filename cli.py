@@ -0,0 +1,243 @@
+"""One command-line entry point for the Bent, Harvard and trend analyses.
+
+    python cli.py bent Bent_Skin/deidentified_data.csv --headless
+    python cli.py bent "exports/participant_*.csv" --headless --workers 8
+    python cli.py harvard cleanse aw_fb_cleansed.csv
+    python cli.py harvard stats participant_summary_corrected.csv
+    python cli.py harvard demographics processed_participant_data.csv
+    python cli.py harvard correlate processed_participant_data.csv
+    python cli.py trends --pdf trend_reports.pdf --stats trend_stats.csv
+    python cli.py power --alpha 0.05 0.01 --plot power_surface.pdf
+    python cli.py check-imports
+
+Only the standard library is imported at start-up. numpy, pandas,
+matplotlib, scipy, seaborn and statsmodels are imported inside the
+subcommand that needs them, so ``--help`` and argument errors return
+immediately; ``check-imports`` measures that start-up cost against
+IMPORT_BUDGET_MS.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# The analysis modules import each other by bare name from their own folders
+sys.path[:0] = [os.path.join(ROOT, 'Bent_Skin'), os.path.join(ROOT, 'Harvard')]
+
+# Start-up import time allowed for `cli.py --help` (as reported by -X importtime)
+IMPORT_BUDGET_MS = 50
+# None of these may be imported before a subcommand runs
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'scipy', 'seaborn', 'statsmodels')
+
+# Scripts whose SERIES are reported by `trends` when no CSVs are given
+TREND_SCRIPTS = [
+    os.path.join(ROOT, 'ClinicalTrials', 'Graph_code.py'),
+    os.path.join(ROOT, 'Graph code ', 'Graph for Sales by Year.py'),
+]
+
+
+def _bent(args):
+    if args.headless:
+        import matplotlib
+        matplotlib.use('Agg')
+    import Bent_analysis
+
+    Bent_analysis.main(csv_path=args.csv, pdf_path=args.pdf, headless=args.headless, workers=args.workers,
+                       render_mode=args.render_mode, n_boot=args.bootstrap, seed=args.seed,
+                       regression=args.regression, quality_filter=args.quality)
+
+
+def _harvard_cleanse(args):
+    import data_cleanse
+    from schemas import HARVARD_SCHEMA, memory_report, read_with_schema
+
+    df = read_with_schema(args.csv, HARVARD_SCHEMA)
+    print(memory_report(df, os.path.splitext(os.path.basename(args.csv))[0]))
+    summary_df = data_cleanse.cleanse(df)
+    summary_df.to_csv(args.out, index=False)
+    print(f"\nAnalysis complete. Results saved to {args.out}")
+
+
+def _harvard_stats(args):
+    import statistical_analysis
+    from schemas import HARVARD_SCHEMA, read_with_schema
+
+    df_pivoted = statistical_analysis.process_participants(read_with_schema(args.csv, HARVARD_SCHEMA))
+    df_pivoted.to_csv(args.out, index=False)
+    print(f"Processed data saved to {args.out}")
+    statistical_analysis.run_tests(df_pivoted)
+
+
+def _harvard_demographics(args):
+    import demographics
+    from schemas import HARVARD_SCHEMA, read_with_schema
+
+    results = demographics.describe(read_with_schema(args.csv, HARVARD_SCHEMA))
+    demographics.save(*results, out_dir=args.out_dir)
+
+
+def _harvard_correlate(args):
+    from schemas import HARVARD_SCHEMA, read_with_schema
+
+    df = read_with_schema(args.csv, HARVARD_SCHEMA)
+    if args.by_activity:
+        import correlations_by_activity
+        correlations_by_activity.correlate_by_activity(df)
+        return
+
+    import correlation_avg_hr_aw_fb
+    corr, p_value = correlation_avg_hr_aw_fb.correlate(df)
+    if args.plot or args.show:
+        if not args.show:
+            import matplotlib
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        fig = correlation_avg_hr_aw_fb.plot(df, corr, p_value, prediction=args.prediction_band,
+                                           n_boot=args.bootstrap, seed=args.seed, workers=args.workers)
+        if args.plot:
+            fig.savefig(args.plot, bbox_inches='tight')
+            print(f"Plot saved to {args.plot}")
+        if args.show:
+            plt.show()
+
+
+def _load_script(path, name):
+    # The trend scripts live in folders with spaces in their names, so load by path
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _trends(args):
+    import matplotlib
+    matplotlib.use('Agg')
+    from trend_reports import load_series, run_reports
+
+    if args.csv:
+        series = [s for path in args.csv for s in load_series(path, year_col=args.year_col)]
+    else:
+        series = [s for k, script in enumerate(TREND_SCRIPTS) for s in _load_script(script, f'trend_script_{k}').SERIES]
+    run_reports(series, args.pdf, args.stats, args.yearly, verbose=not args.quiet)
+
+
+def _power(args):
+    import correlation_power
+    correlation_power.main(args.extra + args.options)
+
+
+def import_time(argv=('--help',)):
+    """Start-up import cost of ``cli.py <argv>`` in a fresh interpreter.
+
+    Returns (total ms, heavy modules imported, [(cumulative ms, module)] for
+    the top-level imports), from Python's -X importtime report.
+    """
+    import re
+    import subprocess
+
+    proc = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv],
+                          capture_output=True, text=True)
+    total_us, top, heavy = 0, [], set()
+    for line in proc.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)', line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        total_us += self_us
+        if name.split('.')[0] in HEAVY_MODULES:
+            heavy.add(name.split('.')[0])
+        if len(indent) == 1:
+            top.append((cumulative_us / 1000, name))
+    return total_us / 1000, sorted(heavy), sorted(top, reverse=True)
+
+
+def _check_imports(args):
+    total_ms, heavy, top = import_time()
+    print(f"Start-up imports: {total_ms:.1f} ms (budget {args.budget} ms)")
+    for ms, name in top[:8]:
+        print(f"  {ms:8.1f} ms  {name}")
+    if heavy:
+        print(f"Heavy modules imported at start-up: {', '.join(heavy)}")
+    ok = total_ms <= args.budget and not heavy
+    print("Within budget" if ok else "Over budget")
+    return 0 if ok else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Wearable heart-rate analyses (Bent, Harvard, trend reports)')
+    parser.add_argument('--trace', action='store_true', help='record stage timings/memory to traces/ (or set ANALYSIS_TRACE=1)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bent = commands.add_parser('bent', help='Bent et al. device-vs-ECG figures and correlation tables')
+    bent.add_argument('csv', help='deidentified_data.csv, or a directory / glob of per-participant partition CSVs')
+    bent.add_argument('--pdf', default='bent_analysis_figures.pdf')
+    bent.add_argument('--headless', action='store_true',
+                      help='non-interactive backend; with --workers > 1, pages rasterised in a process pool')
+    bent.add_argument('--workers', type=int, default=None)
+    bent.add_argument('--render-mode', choices=['density', 'scatter'], default='density')
+    bent.add_argument('--bootstrap', type=int, default=10000, help='cluster-bootstrap replicates (0 to skip)')
+    bent.add_argument('--seed', type=int, default=0)
+    bent.add_argument('--regression', action='store_true', help='add the OLS line and 95%% confidence band to Figures 1-3')
+    bent.add_argument('--quality', action='store_true', help='drop out-of-range, flatline and jump artifacts first')
+    bent.set_defaults(func=_bent)
+
+    harvard = commands.add_parser('harvard', help='Harvard Apple Watch/Fitbit analyses')
+    steps = harvard.add_subparsers(dest='step', required=True)
+    cleanse = steps.add_parser('cleanse', help='raw export -> mean HR per device/participant/activity')
+    cleanse.add_argument('csv', help='aw_fb_cleansed.csv')
+    cleanse.add_argument('--out', default='participant_summary_corrected.csv')
+    cleanse.set_defaults(func=_harvard_cleanse)
+    stats = steps.add_parser('stats', help='per-participant AW/FB means, paired t-test and ANOVA')
+    stats.add_argument('csv', help='participant_summary_corrected.csv')
+    stats.add_argument('--out', default='processed_participant_data.csv')
+    stats.set_defaults(func=_harvard_stats)
+    demo = steps.add_parser('demographics', help='age/BMI descriptives and gender counts')
+    demo.add_argument('csv', help='processed_participant_data.csv')
+    demo.add_argument('--out-dir', default='.')
+    demo.set_defaults(func=_harvard_demographics)
+    correlate = steps.add_parser('correlate', help='AW vs FB correlation of the participant means')
+    correlate.add_argument('csv', help='processed_participant_data.csv (participant_summary_corrected.csv with --by-activity)')
+    correlate.add_argument('--by-activity', action='store_true', help='correlate within each activity instead')
+    correlate.add_argument('--plot', default=None, help='save the regression plot to this file')
+    correlate.add_argument('--show', action='store_true', help='show the regression plot interactively')
+    correlate.add_argument('--prediction-band', action='store_true', help='also draw the 95%% prediction band')
+    correlate.add_argument('--bootstrap', type=int, default=0, help='bootstrap the confidence band with this many resamples')
+    correlate.add_argument('--seed', type=int, default=0)
+    correlate.add_argument('--workers', type=int, default=None, help='process pool for --bootstrap')
+    correlate.set_defaults(func=_harvard_correlate)
+
+    trends = commands.add_parser('trends', help='yearly trend reports (default: clinical studies and sales)')
+    trends.add_argument('csv', nargs='*', help='CSV files with a Year column and one column per series')
+    trends.add_argument('--year-col', default='Year')
+    trends.add_argument('--pdf', default='trend_reports.pdf')
+    trends.add_argument('--stats', default='trend_stats.csv', help='one row of statistics per series')
+    trends.add_argument('--yearly', default=None, help='also write the tidy series x year table')
+    trends.add_argument('--quiet', action='store_true')
+    trends.set_defaults(func=_trends)
+
+    power = commands.add_parser('power', help='Fisher-z correlation power / sample-size grids', add_help=False,
+                                description='Options are passed to correlation_power.py (see its --help)')
+    power.add_argument('options', nargs=argparse.REMAINDER)
+    power.set_defaults(func=_power)
+
+    check = commands.add_parser('check-imports', help='measure start-up import time against the budget')
+    check.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help='milliseconds')
+    check.set_defaults(func=_check_imports)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # Options after `power` belong to correlation_power.py, so leave them unparsed
+    args, args.extra = parser.parse_known_args(argv)
+    if args.extra and args.command != 'power':
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    if args.trace:
+        import instrumentation
+        instrumentation.enable()
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Power and sample size for correlation tests over whole (r, n, alpha) grids.
+
+Uses the Fisher-z approximation: atanh(r_hat) is roughly normal with mean
+atanh(r) and SD 1/sqrt(n - 3), so power and the n needed for a target power
+have closed forms that broadcast over NumPy arrays. Replaces the
+TTestIndPower.solve_power call (a scalar iterative solver for two-sample
+t-tests) that ClinicalTrials/Graph_code.py used.
+
+Readings that share a participant are not independent. effective_n() shrinks
+the row count by the design effect 1 + (m - 1) * ICC, with m the
+size-weighted mean cluster size and the ICC estimated by icc_oneway(), e.g.
+from the device-ECG differences within each Bent ID.
+
+    python correlation_power.py --r 0.1 0.9 --n 10 500 --plot power_surface.pdf
+    python correlation_power.py --bent Bent_Skin/deidentified_data.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+ALTERNATIVES = ('two-sided', 'greater', 'less')
+
+
+def _critical(alpha, alternative):
+    alpha = np.asarray(alpha, dtype=float)
+    if alternative not in ALTERNATIVES:
+        raise ValueError(f"alternative must be one of {ALTERNATIVES}, got {alternative!r}")
+    return stats.norm.isf(alpha / 2 if alternative == 'two-sided' else alpha)
+
+
+def fisher_z_power(r, n, alpha=0.05, alternative='two-sided', r0=0.0):
+    """Power of the test of rho = r0 when the true correlation is r, for n pairs.
+
+    r, n and alpha broadcast against each other; n <= 3 gives NaN.
+    """
+    r, n = np.asarray(r, dtype=float), np.asarray(n, dtype=float)
+    crit = _critical(alpha, alternative)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = (np.arctanh(r) - np.arctanh(r0)) * np.sqrt(n - 3)
+    if alternative == 'two-sided':
+        power = stats.norm.cdf(shift - crit) + stats.norm.cdf(-shift - crit)
+    elif alternative == 'greater':
+        power = stats.norm.cdf(shift - crit)
+    else:
+        power = stats.norm.cdf(-shift - crit)
+    return np.where(n > 3, power, np.nan)
+
+
+def required_n(r, power=0.8, alpha=0.05, alternative='two-sided', r0=0.0):
+    """Smallest n with at least the target power (Fisher-z, rounded up).
+
+    For two-sided tests the far tail is ignored, which is what makes the
+    closed form possible; it adds well under 1e-3 power at any useful n.
+    r, power and alpha broadcast; r == r0, and a one-sided alternative that
+    points away from r (r < r0 for 'greater', r > r0 for 'less'), give inf.
+    """
+    r = np.asarray(r, dtype=float)
+    crit = _critical(alpha, alternative)
+    delta = np.arctanh(r) - np.arctanh(r0)
+    if alternative == 'two-sided':
+        delta = np.abs(delta)
+    elif alternative == 'less':
+        delta = -delta
+    with np.errstate(divide='ignore'):
+        n = ((crit + stats.norm.ppf(power)) / delta) ** 2 + 3
+    return np.ceil(np.where(delta > 0, n, np.inf))
+
+
+def icc_oneway(values, groups):
+    """One-way ANOVA estimate of the intraclass correlation of values within groups.
+
+    Returns (icc, cluster_sizes). NaN values are dropped; the estimate is
+    clipped at 0 when between-group variation is below what chance gives.
+    """
+    values = np.asarray(values, dtype=float)
+    codes = pd.factorize(np.asarray(groups))[0]
+    keep = ~np.isnan(values) & (codes >= 0)
+    values, codes = values[keep], codes[keep]
+    sizes = np.bincount(codes)
+    present = sizes > 0
+    k, total = present.sum(), len(values)
+    if k < 2 or total <= k:
+        return np.nan, sizes[present]
+
+    means = np.bincount(codes, weights=values)[present] / sizes[present]
+    grand = values.mean()
+    ms_between = (sizes[present] * (means - grand) ** 2).sum() / (k - 1)
+    ms_within = ((values - np.bincount(codes, weights=values)[codes] / sizes[codes]) ** 2).sum() / (total - k)
+    # Size-adjusted mean cluster size for unbalanced groups
+    m0 = (total - (sizes[present] ** 2).sum() / total) / (k - 1)
+    icc = (ms_between - ms_within) / (ms_between + (m0 - 1) * ms_within)
+    return max(float(icc), 0.0), sizes[present]
+
+
+def design_effect(cluster_sizes, icc):
+    # 1 + (m - 1) * ICC with m = sum(m_i^2) / sum(m_i), which reduces to the
+    # plain mean cluster size when every cluster is the same size
+    sizes = np.asarray(cluster_sizes, dtype=float)
+    m = (sizes ** 2).sum() / sizes.sum()
+    return 1 + (m - 1) * np.asarray(icc, dtype=float)
+
+
+def effective_n(cluster_sizes, icc):
+    """Number of independent observations the clustered readings are worth."""
+    return np.asarray(cluster_sizes, dtype=float).sum() / design_effect(cluster_sizes, icc)
+
+
+def power_grid(r, n, alpha=0.05, alternative='two-sided'):
+    """Tidy table of power for every combination of r, n and alpha."""
+    r, n, alpha = np.atleast_1d(r).astype(float), np.atleast_1d(n).astype(float), np.atleast_1d(alpha).astype(float)
+    rr, nn, aa = np.meshgrid(r, n, alpha, indexing='ij')
+    power = fisher_z_power(rr, nn, aa, alternative)
+    return pd.DataFrame({'r': rr.ravel(), 'n': nn.ravel().astype(int), 'alpha': aa.ravel(), 'power': power.ravel()})
+
+
+def plot_power_surface(ax, r, n, alpha=0.05, alternative='two-sided', target=0.8):
+    """Filled contour of power over (n, r) with the target-power line marked."""
+    r, n = np.asarray(r, dtype=float), np.asarray(n, dtype=float)
+    power = fisher_z_power(r[:, None], n[None, :], alpha, alternative)
+    filled = ax.contourf(n, r, power, levels=np.linspace(0, 1, 11), cmap='viridis')
+    line = ax.contour(n, r, power, levels=[target], colors='red', linewidths=1.5)
+    ax.clabel(line, fmt={target: f'power {target:g}'}, fontsize=9)
+    ax.set_xlabel('Sample size (n)')
+    ax.set_ylabel('True correlation (r)')
+    ax.set_title(f'Correlation test power (Fisher z, alpha = {alpha:g}, {alternative})')
+    return filled
+
+
+def bent_effective_n(data, devices=None):
+    """Per device and skin-tone group: rows, participants, ICC of the device-ECG
+    difference within ID, and the effective number of independent readings."""
+    # bent_index lives with the Bent scripts
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Bent_Skin'))
+    from bent_index import SelectionIndex
+
+    index = SelectionIndex(data, devices)
+    ids = np.asarray(data['ID'])
+    rows = []
+    for dev in index.devices:
+        for stratum in ('overall', 'lighter', 'darker'):
+            idx = index.rows(dev, stratum)
+            diff = index.values[dev][idx] - index.values['ECG'][idx]
+            icc, sizes = icc_oneway(diff, ids[idx])
+            rows.append({'device': dev, 'group': stratum, 'rows': len(idx), 'participants': len(sizes),
+                         'icc': icc, 'design_effect': float(design_effect(sizes, icc)),
+                         'effective_n': float(effective_n(sizes, icc))})
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fisher-z power / sample-size grids for correlation tests')
+    parser.add_argument('--r', type=float, nargs=2, default=[0.05, 0.95], metavar=('MIN', 'MAX'))
+    parser.add_argument('--n', type=int, nargs=2, default=[10, 500], metavar=('MIN', 'MAX'))
+    parser.add_argument('--alpha', type=float, nargs='+', default=[0.05])
+    parser.add_argument('--power', type=float, default=0.8, help='target power for the required-n table')
+    parser.add_argument('--alternative', choices=ALTERNATIVES, default='two-sided')
+    parser.add_argument('--grid', default=None, help='write the full r x n x alpha power grid to this CSV')
+    parser.add_argument('--plot', default=None, help='save power surfaces (one per alpha) to this file')
+    parser.add_argument('--bent', default=None, help='deidentified_data.csv: report cluster-adjusted effective n')
+    args = parser.parse_args(argv)
+
+    r_values = np.round(np.linspace(args.r[0], args.r[1], 19), 3)
+    n_values = np.arange(args.n[0], args.n[1] + 1)
+
+    needed = required_n(r_values[:, None], args.power, np.array(args.alpha)[None, :], args.alternative)
+    # r == r0, or a one-sided alternative pointing away from r, never reaches the power
+    table = pd.DataFrame(np.where(np.isinf(needed), np.nan, needed), index=pd.Index(r_values, name='r'),
+                         columns=[f'alpha={a:g}' for a in args.alpha]).astype('Int64')
+    print(f"--- Required n for power {args.power:g} ({args.alternative}) ---")
+    print(table.astype('string').fillna('unreachable').to_string())
+    return table
+
+    if args.grid:
+        power_grid(r_values, n_values, args.alpha, args.alternative).to_csv(args.grid, index=False)
+        print(f"\nPower grid saved to {args.grid}")
+
+    if args.plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        fig, axes = plt.subplots(1, len(args.alpha), figsize=(7 * len(args.alpha), 5.5), squeeze=False)
+        r_fine = np.linspace(args.r[0], args.r[1], 200)
+        for ax, alpha in zip(axes[0], args.alpha):
+            filled = plot_power_surface(ax, r_fine, n_values, alpha, args.alternative, args.power)
+        fig.colorbar(filled, ax=axes[0].tolist(), label='Power')
+        fig.savefig(args.plot, bbox_inches='tight')
+        print(f"Power surface saved to {args.plot}")
+
+    if args.bent:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Bent_Skin'))
+        from bent_loader import load_data
+        print("\n--- Cluster-adjusted effective n (device - ECG difference within ID) ---")
+        print(bent_effective_n(load_data(args.bent)).round(3).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Stage-level timing and memory tracing shared by the Bent and Harvard scripts.
+
+Wrap each stage of a run in ``with stage('name') as st:`` and set
+``st.rows`` when a row count is known. Tracing is off unless the
+ANALYSIS_TRACE environment variable is set to 1/true/yes/on or a trace
+directory (0/false/no/off leave it off), or ``enable()`` is called (the scripts' --trace flags do this); while off,
+``stage`` hands back one shared no-op object. While on, every stage records
+wall time, CPU time, peak tracemalloc memory and rows, and at exit the run
+is written to traces/ as JSON, CSV and folded stacks (for flamegraph tools)
+with a text summary printed to the console.
+"""
+import atexit
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ENV_VAR = 'ANALYSIS_TRACE'
+_ON = ('1', 'true', 'yes', 'on')
+_OFF = ('', '0', 'false', 'no', 'off')
+
+_enabled = False
+_trace_dir = 'traces'
+_records = []
+_stack = []
+# Order in which each call path was first entered, for the summary layout
+_first_seen = {}
+
+
+class _NullStage:
+    # Shared stand-in used while tracing is off; ignores everything
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        if _stack:
+            # Fold the parent's peak so far in before resetting for this stage
+            parent = _stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.path = [s.name for s in _stack] + [self.name]
+        _first_seen.setdefault(';'.join(self.path), len(_first_seen))
+        self.peak = 0
+        # Wall time of this call's direct children, for its self time
+        self.child_wall = 0.0
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        _stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        _stack.pop()
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, self.peak)
+            _stack[-1].child_wall += wall
+        _records.append({'stage': self.name, 'path': ';'.join(self.path), 'depth': len(self.path) - 1,
+                         'wall_s': wall, 'self_s': max(wall - self.child_wall, 0.0),
+                         'cpu_s': cpu, 'peak_mb': self.peak / 2**20,
+                         'rows': self.rows, 'failed': exc[0] is not None})
+        return False
+
+
+def stage(name, rows=None):
+    """Context manager timing one stage; a shared no-op when tracing is off."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace_dir=None):
+    """Turn tracing on for this process and write the trace when it exits."""
+    global _enabled, _trace_dir
+    if trace_dir:
+        _trace_dir = trace_dir
+    if not _enabled:
+        _enabled = True
+        tracemalloc.start()
+        atexit.register(write_trace)
+
+
+def summary():
+    # Flame-style text view: stages nested by call path, bar width by wall time
+    if not _records:
+        return ''
+    total = sum(r['wall_s'] for r in _records if r['depth'] == 0) or 1e-12
+    # Records are appended on exit (children first); sort parents before children
+    order = sorted(_records, key=lambda r: _first_seen[r['path']])
+    lines = [f"{'stage':<44} {'wall s':>8} {'cpu s':>8} {'peak MB':>9} {'rows':>10}"]
+    for r in order:
+        bar = '#' * max(1, round(30 * r['wall_s'] / total))
+        label = '  ' * r['depth'] + r['stage']
+        rows = '' if r['rows'] is None else r['rows']
+        lines.append(f"{label[:44]:<44} {r['wall_s']:8.3f} {r['cpu_s']:8.3f} {r['peak_mb']:9.1f} {rows:>10}  {bar}")
+    return '\n'.join(lines)
+
+
+def write_trace(run_name=None):
+    """Write the records to traces/<run>_<timestamp>.{json,csv,folded} and print the summary."""
+    if not _records:
+        return None
+    run_name = run_name or os.path.splitext(os.path.basename(sys.argv[0] or 'run'))[0] or 'run'
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    os.makedirs(_trace_dir, exist_ok=True)
+    base = os.path.join(_trace_dir, f'{run_name}_{stamp}')
+
+    with open(base + '.json', 'w') as f:
+        json.dump({'run': run_name, 'argv': sys.argv, 'records': _records}, f, indent=1)
+    with open(base + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(_records[0]))
+        writer.writeheader()
+        writer.writerows(_records)
+    # Folded stacks with self time in microseconds (flamegraph.pl / speedscope input);
+    # each call's own self time is summed per path, so repeated calls of a
+    # stage don't have each other's children subtracted
+    self_time = {}
+    for r in _records:
+        self_time[r['path']] = self_time.get(r['path'], 0.0) + r['self_s']
+    with open(base + '.folded', 'w') as f:
+        for path in sorted(self_time, key=_first_seen.get):
+            f.write(f"{path} {int(self_time[path] * 1e6)}\n")
+
+    print(f"\n=== Stage trace ({base}.json) ===")
+    print(summary())
+    _records.clear()
+    return base
+
+
+_setting = os.environ.get(ENV_VAR, '').strip()
+if _setting.lower() not in _OFF:
+    enable(None if _setting.lower() in _ON else _setting)
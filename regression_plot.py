@@ -0,0 +1,149 @@
+"""Least-squares regression line with closed-form confidence/prediction bands.
+
+Replaces seaborn's regplot(ci=95), which refits the line to 1000 bootstrap
+resamples on every render. The OLS fit needs only five sums over the points,
+and the bands follow from the usual t-based standard errors
+
+    confidence:  s * sqrt(1/n + (x0 - mean_x)^2 / Sxx)
+    prediction:  s * sqrt(1 + 1/n + (x0 - mean_x)^2 / Sxx)
+
+evaluated on a fixed grid, so drawing the line and band costs the same for
+ten points or a million. A percentile bootstrap band (pairs resampled, seeded,
+sharded across a process pool like bent_bootstrap.py) is still available with
+n_boot > 0.
+
+Used by Harvard/correlation_avg_hr_aw_fb.py and, with --regression, by the
+device-vs-ECG panels of Bent_Skin/Bent_analysis.py.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import stats
+
+
+class OLSFit:
+    """Slope, intercept and residual SD of y on x from centred sums.
+
+    With fewer than 3 pairs the residual SD (and so any band) is undefined
+    and s is NaN; with fewer than 2 the slope is NaN as well.
+    """
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = ~np.isnan(x) & ~np.isnan(y)
+        x, y = x[keep], y[keep]
+        self.n = len(x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean_x = x.mean() if self.n else np.nan
+            self.mean_y = y.mean() if self.n else np.nan
+            dx, dy = x - self.mean_x, y - self.mean_y
+            self.sxx = dx @ dx
+            self.slope = (dx @ dy) / self.sxx
+            self.intercept = self.mean_y - self.slope * self.mean_x
+            resid = dy - self.slope * dx
+            self.s = np.sqrt((resid @ resid) / (self.n - 2)) if self.n >= 3 else np.nan
+        self.x_range = (x.min(), x.max()) if self.n else (np.nan, np.nan)
+
+    @classmethod
+    def from_moments(cls, n, mean_x, mean_y, m2_x, m2_y, c_xy, x_range):
+        """Fit from pooled counts, means and centred sums (as PearsonStats keeps them)."""
+        fit = cls.__new__(cls)
+        fit.n, fit.mean_x, fit.mean_y, fit.sxx = int(n), mean_x, mean_y, m2_x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fit.slope = np.float64(c_xy) / m2_x
+            fit.intercept = mean_y - fit.slope * mean_x
+            fit.s = np.sqrt(max(m2_y - c_xy * fit.slope, 0.0) / (fit.n - 2)) if fit.n >= 3 else np.nan
+        fit.x_range = tuple(x_range)
+        return fit
+
+    def predict(self, x0):
+        return self.intercept + self.slope * np.asarray(x0, dtype=float)
+
+    def band(self, x0, level=0.95, kind='confidence'):
+        """(low, high) of the confidence band for the mean or the prediction band for new points."""
+        if kind not in ('confidence', 'prediction'):
+            raise ValueError(f"kind must be 'confidence' or 'prediction', got {kind!r}")
+        if self.n < 3:
+            raise ValueError(f"Need at least 3 (x, y) pairs for a regression band, got {self.n}")
+        x0 = np.asarray(x0, dtype=float)
+        t = stats.t.isf((1 - level) / 2, self.n - 2)
+        se = self.s * np.sqrt((kind == 'prediction') + 1 / self.n + (x0 - self.mean_x) ** 2 / self.sxx)
+        fit = self.predict(x0)
+        return fit - t * se, fit + t * se
+
+
+def _bootstrap_shard(seed, x, y, grid, n_reps):
+    # Each replicate is a vector of draw counts per point, so the sums of all
+    # replicates in the shard are one (replicates x points) @ (points x 5) product
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(len(x), np.full(len(x), 1.0 / len(x)), size=n_reps)
+    n, sx, sy, sxx, sxy = (counts @ np.column_stack([np.ones_like(x), x, y, x * x, x * y])).T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sxy - sx * sy / n) / (sxx - sx * sx / n)
+    intercept = (sy - slope * sx) / n
+    return intercept[:, None] + slope[:, None] * grid[None, :]
+
+
+def bootstrap_band(x, y, grid, level=0.95, n_boot=1000, seed=0, workers=None, shard_size=250):
+    """Percentile band of the refitted line over grid from n_boot pair resamples.
+
+    Shards get children of SeedSequence(seed), so the band does not depend on
+    the number of workers; workers == 1 runs in-process.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(x) & ~np.isnan(y)
+    # Centre so the replicate sums stay well conditioned, then shift back
+    cx, cy = x[keep].mean(), y[keep].mean()
+    x, y, grid = x[keep] - cx, y[keep] - cy, np.asarray(grid, dtype=float) - cx
+
+    n_shards = -(-n_boot // shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    reps = [min(shard_size, n_boot - k * shard_size) for k in range(n_shards)]
+    if workers == 1 or n_shards == 1:
+        lines = [_bootstrap_shard(s, x, y, grid, n) for s, n in zip(seeds, reps)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            lines = list(pool.map(_bootstrap_shard, seeds, [x] * n_shards, [y] * n_shards,
+                                  [grid] * n_shards, reps))
+    tail = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(np.vstack(lines), [tail, 100 - tail], axis=0)
+    return low + cy, high + cy
+
+
+def plot_regression(ax, x, y, level=0.95, prediction=False, n_boot=0, seed=0, workers=None,
+                    scatter=True, grid_points=100, color='red', scatter_kws=None, line_kws=None, fit=None):
+    """Scatter (optional), OLS line and its band on ax; returns the OLSFit.
+
+    The band is the closed-form confidence band unless n_boot > 0, which
+    swaps in the bootstrap band. prediction=True adds the (wider) band for
+    individual new observations as a dashed outline. The line spans the
+    range of x, as regplot draws it. A precomputed fit (e.g. from_moments
+    over partitioned data) can be passed with x and y left as None, except
+    with n_boot > 0, which resamples the raw points. With fewer than 3
+    pairs (e.g. a small skin-tone stratum) only the line is drawn; with
+    fewer than 2 there is no line either.
+    """
+    if n_boot and (x is None or y is None):
+        raise ValueError("A bootstrap band (n_boot > 0) needs the raw x and y, not only a precomputed fit")
+    fit = OLSFit(x, y) if fit is None else fit
+    if scatter:
+        ax.scatter(x, y, **{'alpha': 0.7, **(scatter_kws or {})})
+    if fit.n < 2:
+        return fit
+    grid = np.linspace(*fit.x_range, grid_points)
+    line_kws = {'color': color, **(line_kws or {})}
+    ax.plot(grid, fit.predict(grid), **line_kws)
+    if fit.n < 3:
+        return fit
+    if n_boot:
+        low, high = bootstrap_band(x, y, grid, level, n_boot=n_boot, seed=seed, workers=workers)
+    else:
+        low, high = fit.band(grid, level)
+    ax.fill_between(grid, low, high, color=line_kws['color'], alpha=0.15, linewidth=0)
+    if prediction:
+        low, high = fit.band(grid, level, kind='prediction')
+        ax.plot(grid, low, color=line_kws['color'], linestyle='--', linewidth=0.8)
+        ax.plot(grid, high, color=line_kws['color'], linestyle='--', linewidth=0.8)
+    return fit
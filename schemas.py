@@ -0,0 +1,79 @@
+"""Declared column dtypes for the Bent and Harvard CSVs.
+
+Plain ``pd.read_csv`` gives float64 heart rates, int64 skin tones and Python
+string objects for the ID/activity/device columns. The schemas below parse
+straight into compact dtypes instead: float32 for the Bent heart rates,
+nullable Int8 for the Fitzpatrick skin tone (missing values stay missing)
+and categoricals for the labels, so filters and groupbys run on small
+integer codes. Computations still upcast to float64 where they accumulate
+sums.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+HR_DTYPE = 'float32'
+
+# deidentified_data.csv: ECG reference, the six wearables, then the labels
+BENT_SCHEMA = {
+    'ECG': HR_DTYPE,
+    'Apple Watch': HR_DTYPE,
+    'Empatica': HR_DTYPE,
+    'Garmin': HR_DTYPE,
+    'Fitbit': HR_DTYPE,
+    'Miband': HR_DTYPE,
+    'Biovotion': HR_DTYPE,
+    'ID': 'category',
+    'Skin Tone': 'Int8',
+    'Activity': 'category',
+}
+
+# aw_fb_cleansed.csv and the participant summary written by data_cleanse.
+# BMI, gender and age identify a participant, so BMI and age keep their
+# exact values. heart_rate stays float64 too: the published Harvard means,
+# t-test and correlations shift by ~3e-6 when it is read as float32, so
+# only the labels are compacted.
+HARVARD_SCHEMA = {
+    'heart_rate': 'float64',
+    'device': 'category',
+    'activity': 'category',
+    'gender': 'category',
+}
+
+
+def read_with_schema(path, schema, **kwargs):
+    """pd.read_csv with the schema's dtypes; schema columns the file lacks are ignored."""
+    return pd.read_csv(path, dtype=schema, **kwargs)
+
+
+def apply_schema(frame, schema):
+    # Same conversion for a frame that is already in memory
+    dtypes = {col: dtype for col, dtype in schema.items() if col in frame.columns}
+    return frame.astype(dtypes)
+
+
+def default_memory(frame):
+    """Bytes the frame would take (deep) if read by plain pd.read_csv.
+
+    Numeric columns would be 8 bytes per row; text categoricals would be an
+    object column holding one pointer plus one str object per row.
+    """
+    total = frame.index.memory_usage()
+    for col in frame.columns:
+        values = frame[col]
+        if isinstance(values.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(values.cat.categories):
+            # Code -1 (missing) picks the last entry, the size of a float NaN
+            sizes = np.array([sys.getsizeof(c) for c in values.cat.categories] + [sys.getsizeof(np.nan)])
+            total += 8 * len(values) + int(sizes[values.cat.codes.to_numpy()].sum())
+        else:
+            total += 8 * len(values)
+    return total
+
+
+def memory_report(frame, label='Data'):
+    compact = int(frame.memory_usage(deep=True).sum())
+    default = default_memory(frame)
+    saved = default - compact
+    return (f"{label}: {compact / 2**20:.1f} MB with the compact schema vs {default / 2**20:.1f} MB "
+            f"with default dtypes ({saved / 2**20:.1f} MB, {100 * saved / max(default, 1):.0f}% saved)")
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Bent_Skin'))
+from bent_loader import load_data
+
+CSV = """ECG,Apple Watch,Empatica,Garmin,Fitbit,Miband,Biovotion,ID,Skin Tone,Activity
+80,81,,79,80,82,78,1,2,Rest
+90,88,91,,89,90,92,1,2,Rest
+100,101,99,98,,97,100,2,5,Walk
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'deidentified_data.csv'
+    path.write_text(CSV)
+    return str(path)
+
+
+def test_cached_frame_can_be_edited_in_place(csv_path):
+    load_data(csv_path)
+    data = load_data(csv_path)  # second call reads the memory-mapped cache
+    data.loc[data['ECG'] > 85, 'ECG'] = np.nan
+    assert data['ECG'].isna().sum() == 2
+    # The cache files are copy-on-write and keep the original values
+    assert load_data(csv_path)['ECG'].isna().sum() == 0
+
+
+def test_digest_mismatch_raises_unless_unverified(csv_path, tmp_path):
+    (tmp_path / 'SHA256SUMS.txt').write_text(f"{hashlib.sha256(b'other').hexdigest()}  deidentified_data.csv\n")
+    with pytest.raises(ValueError, match='SHA256SUMS'):
+        load_data(csv_path)
+    assert not (tmp_path / '.cache').exists()
+    assert len(load_data(csv_path, verify=False)) == 3
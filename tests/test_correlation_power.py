@@ -0,0 +1,28 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from correlation_power import main, required_n
+
+
+def test_required_n_one_sided_away_from_r():
+    assert np.isinf(required_n(0.3, alternative='less'))
+    assert np.isinf(required_n(-0.3, alternative='greater'))
+    assert np.isfinite(required_n(0.3, alternative='greater'))
+
+
+def test_main_marks_unreachable_cells(capsys):
+    table = main(['--alternative', 'less', '--r', '0.1', '0.5'])
+    out = capsys.readouterr().out
+    assert table.isna().all().all()
+    assert 'unreachable' in out
+    assert '-9223372036854775808' not in out
+
+
+def test_main_r_equal_r0_row(capsys):
+    table = main(['--r', '0', '0.5'])
+    assert table.iloc[0].isna().all()
+    assert table.iloc[1:].notna().all().all()
+    assert 'unreachable' in capsys.readouterr().out
@@ -0,0 +1,215 @@
+"""Yearly trend reports (bar chart, trend line and statistics) for many series at once.
+
+Replaces the per-series copies of the same script (ClinicalTrials/Graph_code.py,
+"Graph code /Graph for Sales by Year.py"). Series come inline as TrendSeries or
+from CSVs with a Year column and one column per series. Statistics for every
+series are computed together on a padded (series x year) array, and all pages
+are drawn on one reused figure into a single multi-page PDF.
+
+    python trend_reports.py "Graph code /Apple Watch Sales by Year - Sheet1.csv" --pdf trends.pdf --stats trend_stats.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import matplotlib.pyplot as plt
+import matplotlib.ticker as ticker
+from matplotlib.backends.backend_pdf import PdfPages
+
+
+class TrendSeries:
+    """One year/value series plus how its report page is labelled."""
+
+    def __init__(self, name, years, values, title=None, ylabel=None, noun='values', unit='',
+                 integer=False, label_format='{:.1f}'):
+        self.name = name
+        self.years = np.asarray(years, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        if self.years.shape != self.values.shape:
+            raise ValueError(f"{name}: {len(self.years)} years but {len(self.values)} values")
+        self.title = title or f'{name} by Year'
+        self.ylabel = ylabel or name
+        # Used in the printed summary, e.g. "Total studies" / "27.1 million"
+        self.noun = noun
+        self.unit = unit
+        # Whole-number data: integer y ticks and bar labels
+        self.integer = integer
+        self.label_format = '{:.0f}' if integer else label_format
+
+
+def load_series(csv_path, year_col='Year', **labels):
+    """One TrendSeries per value column of a CSV with a year column."""
+    df = pd.read_csv(csv_path)
+    return [TrendSeries(col, df[year_col], df[col], **labels) for col in df.columns if col != year_col]
+
+
+def _year(column):
+    # Whole years, NA for a series with no valid years
+    return pd.array(column, dtype='Int64')
+
+
+def trend_stats(series):
+    """Totals, extremes, year-over-year change, Pearson r and the linear trend for every series.
+
+    Returns (summary, yearly): summary has one row per series; yearly has one
+    row per series x year with the value, the percentage change from the
+    previous reported year (0 for the first year, as in the original
+    scripts) and the fitted trend; years with a blank value are left out.
+    Everything is computed on one NaN-padded array, so the cost does not
+    grow with the number of Python-level series loops. A series with no
+    valid years gets NA years and NaN statistics.
+    """
+    width = max(1, max(len(s.years) for s in series))
+    years = np.full((len(series), width), np.nan)
+    values = np.full((len(series), width), np.nan)
+    for i, s in enumerate(series):
+        years[i, :len(s.years)] = s.years
+        values[i, :len(s.values)] = s.values
+    # Move each series' valid (year, value) pairs to the front of its row, in
+    # order, so blank years neither shift the first/last year nor break the
+    # year-over-year change between consecutive reported years
+    present = ~np.isnan(years) & ~np.isnan(values)
+    order = np.argsort(~present, axis=1, kind='stable')
+    years = np.take_along_axis(years, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+    n = present.sum(axis=1)
+    valid = np.arange(width)[None, :] < n[:, None]
+    years[~valid] = np.nan
+    values[~valid] = np.nan
+    rows = np.arange(len(series))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.where(valid, values, 0.0).sum(axis=1)
+        mean = total / n
+        i_max = np.where(valid, values, -np.inf).argmax(axis=1)
+        i_min = np.where(valid, values, np.inf).argmin(axis=1)
+
+        # Least-squares trend and Pearson r from centred sums
+        year_mean = np.where(valid, years, 0.0).sum(axis=1) / n
+        dx = np.where(valid, years - year_mean[:, None], 0.0)
+        dy = np.where(valid, values - mean[:, None], 0.0)
+        sxx, syy, sxy = (dx * dx).sum(axis=1), (dy * dy).sum(axis=1), (dx * dy).sum(axis=1)
+        slope = sxy / sxx
+        intercept = mean - slope * year_mean
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        t = r * np.sqrt((n - 2) / ((1.0 - r) * (1.0 + r)))
+        p = np.where(np.abs(r) == 1, 0.0, 2 * stats.t.sf(np.abs(t), n - 2))
+
+        pct = np.zeros_like(values)
+        pct[:, 1:] = (values[:, 1:] / values[:, :-1] - 1) * 100
+        both = valid[:, 1:] & valid[:, :-1]
+        mean_pct = np.where(both, pct[:, 1:], 0.0).sum(axis=1) / both.sum(axis=1)
+
+    summary = pd.DataFrame({
+        'series': [s.name for s in series],
+        'first_year': _year(years[rows, 0]),
+        'last_year': _year(years[rows, n - 1]),
+        'n_years': n,
+        'total': total,
+        'mean': mean,
+        'max': values[rows, i_max],
+        'year_max': _year(years[rows, i_max]),
+        'min': values[rows, i_min],
+        'year_min': _year(years[rows, i_min]),
+        'mean_yoy_pct': mean_pct,
+        'r': r,
+        'p': p,
+        'slope': slope,
+        'intercept': intercept,
+    })
+    row, col = np.nonzero(valid)
+    yearly = pd.DataFrame({
+        'series': np.array(summary['series'])[row],
+        'year': years[row, col].astype(int),
+        'value': values[row, col],
+        'yoy_pct': pct[row, col],
+        'trend': slope[row] * years[row, col] + intercept[row],
+    })
+    return summary, yearly
+
+
+def print_report(s, row, yearly):
+    # Same layout as the original per-series scripts
+    fmt = s.label_format
+    print(f"--- Trend Statistics: {s.name} ---")
+    print(f"Total {s.noun} from {row['first_year']}-{row['last_year']}: {fmt.format(row['total'])}{s.unit}")
+    print(f"Average {s.noun} per year: {row['mean']:.2f}{s.unit}")
+    print(f"Year with the most {s.noun}: {row['year_max']} with {fmt.format(row['max'])}{s.unit}")
+    print(f"Year with the fewest {s.noun}: {row['year_min']} with {fmt.format(row['min'])}{s.unit}")
+    print(f"\nYear-over-Year Percentage Change in {s.noun.capitalize()}:")
+    table = yearly[['year', 'yoy_pct']].rename(columns={'year': 'Year', 'yoy_pct': 'Year-over-Year Change (%)'})
+    print(table.to_string(index=False))
+    print("\n--- Correlation Analysis ---")
+    print(f"Pearson's r: {row['r']:.4f}")
+    print(f"P-value: {row['p']:.4f}\n")
+
+
+def draw_report(ax, s, row):
+    """Bar chart with value labels and the fitted trend line, drawn onto ax."""
+    ax.clear()
+    # Blank years are skipped rather than drawn as gaps in the trend line
+    ok = ~np.isnan(s.years) & ~np.isnan(s.values)
+    years, values = s.years[ok], s.values[ok]
+    bars = ax.bar(years, values, color='skyblue', edgecolor='black')
+    ax.set_xlabel('Year', fontsize=12)
+    ax.set_ylabel(s.ylabel, fontsize=12)
+    ax.set_title(s.title, fontsize=14, pad=20)
+    ax.set_xticks(years)
+    ax.xaxis.set_major_formatter(ticker.FormatStrFormatter('%d'))
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    if s.integer:
+        ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2, height, s.label_format.format(height),
+                ha='center', va='bottom', fontsize=10)
+    ax.plot(years, row['slope'] * years + row['intercept'], "r--", label="Trend Line")
+    ax.legend()
+
+
+def render_pdf(series, summary, pdf_path):
+    """Write one page per series to pdf_path, in series order.
+
+    Every page is drawn on one reused figure, so fonts, axes and the PDF
+    backend are set up once.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    with PdfPages(pdf_path) as pdf:
+        for s, row in zip(series, summary.to_dict('records')):
+            draw_report(ax, s, row)
+            pdf.savefig(fig, bbox_inches='tight')
+    plt.close(fig)
+
+
+def run_reports(series, pdf_path, stats_path=None, yearly_path=None, verbose=True):
+    """Statistics, printed summaries, the multi-page PDF and optional CSV tables for all series."""
+    summary, yearly = trend_stats(series)
+    if verbose:
+        for s, row in zip(series, summary.to_dict('records')):
+            print_report(s, row, yearly[yearly['series'] == s.name])
+    render_pdf(series, summary, pdf_path)
+    print(f"PDF report '{pdf_path}' ({len(series)} pages) has been created successfully!")
+    if stats_path:
+        summary.to_csv(stats_path, index=False)
+        print(f"Trend statistics saved to {stats_path}")
+    if yearly_path:
+        yearly.to_csv(yearly_path, index=False)
+        print(f"Year-by-year table saved to {yearly_path}")
+    return summary, yearly
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Trend reports for every value column of one or more year/value CSVs')
+    parser.add_argument('csv', nargs='+', help='CSV files with a Year column and one column per series')
+    parser.add_argument('--year-col', default='Year')
+    parser.add_argument('--pdf', default='trend_reports.pdf')
+    parser.add_argument('--stats', default='trend_stats.csv', help='one row of statistics per series')
+    parser.add_argument('--yearly', default=None, help='also write the tidy series x year table')
+    parser.add_argument('--quiet', action='store_true', help="don't print each series' summary")
+    args = parser.parse_args()
+
+    plt.switch_backend('Agg')
+    all_series = [s for path in args.csv for s in load_series(path, year_col=args.year_col)]
+    run_reports(all_series, args.pdf, args.stats, args.yearly, verbose=not args.quiet)